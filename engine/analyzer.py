@@ -1,13 +1,25 @@
 import doctest
-import weakref
+import gc
+import tracemalloc
+from array import array
+from contextlib import contextmanager
 from decimal import Decimal
-from random import choice
-from threading import Thread
+from random import Random
+from threading import Event, Lock, Thread, Timer, get_ident
+from time import perf_counter
 
 try:
     from .core.position import *
+    from .material import probe_material
+    from .pawns import PawnTable
+    from .profiler import PROFILE_HZ, SamplingProfiler
+    from .statistics import SearchStatistics
 except (SystemError, ImportError):
     from core.position import *
+    from material import probe_material
+    from pawns import PawnTable
+    from profiler import PROFILE_HZ, SamplingProfiler
+    from statistics import SearchStatistics
 
 INFINITY = Decimal('1e18')
 
@@ -16,267 +28,462 @@ AUTHOR = 'Lesko Vladislav'
 
 DEFAULT_DEPTH = 2 # full moves (1 move = 2 plies)
 
+MATE_GRADE = Decimal('300')
+DRAW_GRADE = Decimal('0')
 
-class RootMoveNode:
+EVAL_CACHE_SIZE = 16 # MB
+EVAL_CACHE_ENTRY_BYTES = 200 # a list slot, a tuple, an int and a Decimal
+
+# No position has more legal moves, so a margin this large bounds the
+# opponent's mobility term of _estimate exactly.
+FUTILITY_MARGIN = 218
+
+TIMED_METHODS = ['_candidate_moves', '_estimate']
+TIMED_GENERATORS = ['_staged_moves']
+
+MOVE_BUFFER_LEVELS = 3 # nested generations: a node, its opponent's replies and their legality checks
+
+_collection_lock = Lock()
+_paused_searches = 0
+_collection_was_enabled = True
+
+
+@contextmanager
+def paused_collection():
     '''
 
-    >>> root_move = Move('e2e4')
-    >>> root_move_node = RootMoveNode(root_move)
-
-    >>> root_move_node
-    RootMoveNode(Move(Coordinate(4, 1), Coordinate(4, 3), False), Decimal('0'))
-    >>> str(root_move_node)
-    'RootMoveNode for e2e4'
-    >>> root_move_node.move
-    Move(Coordinate(4, 1), Coordinate(4, 3), False)
-    >>> root_move_node.children
-    []
-
-    >>> root_move_node.grade
-    Decimal('0')
-    >>> root_move_node.grade = Decimal('300')
-    >>> root_move_node.grade
-    Decimal('300')
-
-    >>> list(root_move_node.moves_chain)
-    [Move(Coordinate(4, 1), Coordinate(4, 3), False)]
-    >>> list(root_move_node.moves_chain) # doctest: +ELLIPSIS
-    [Move(...)]
+    Freeze the objects that exist before a search and switch the cyclic
+    garbage collector off while it runs. Nested and concurrent searches
+    share one pause.
+
+    >>> with paused_collection():
+    ...     with paused_collection():
+    ...         gc.isenabled()
+    ...     gc.isenabled()
+    False
+    False
+    >>> gc.isenabled()
+    True
 
     '''
-    def __init__(self, move, grade=Decimal('0')):
-        self._move = move
-        self._children = []
+    global _paused_searches, _collection_was_enabled
 
-        self._grade = grade
+    with _collection_lock:
+        if not _paused_searches:
+            _collection_was_enabled = gc.isenabled()
+            gc.freeze()
+            gc.disable()
+        _paused_searches += 1
 
-    @property
-    def move(self):
-        return self._move
+    try:
+        yield
 
-    @property
-    def grade(self):
-        return self._grade
+    finally:
+        with _collection_lock:
+            _paused_searches -= 1
+            if not _paused_searches:
+                gc.unfreeze()
+                if _collection_was_enabled:
+                    gc.enable()
 
-    @grade.setter
-    def grade(self, value):
-        self._grade = value
 
-    def _update_grade(self):
-        best_grade = max(
-            -child.grade for child in self._children
-        )
-        self._grade = best_grade
+def collect_garbage():
+    '''
 
-    @property
-    def children(self):
-        '''
+    Collect cycles between searches, unless another search is running.
 
-        >>> root_move = Move('e2e4')
-        >>> root_move_node = RootMoveNode(root_move)
+    >>> collect_garbage() >= 0
+    True
 
-        >>> child_move_a = Move('a7a6')
-        >>> child_move_a_node = MoveNode(child_move_a, root_move_node)
-        >>> child_move_b = Move('b7b6')
-        >>> child_move_b_node = MoveNode(child_move_b, root_move_node)
+    '''
+    with _collection_lock:
+        if _paused_searches:
+            return 0
 
-        >>> root_move_node.children # doctest: +ELLIPSIS
-        [MoveNode(...), MoveNode(...)]
+        return gc.collect()
 
-        '''
-        return self._children
 
-    @property
-    def moves_chain(self):
-        yield self._move
+class SearchStopped(Exception):
+    pass
 
-    def __str__(self):
-        return f'{type(self).__name__} for {self._move}'
 
-    def __repr__(self):
-        return f'{type(self).__name__}({self._move!r}, {self._grade!r})'
+def _as_grade(value):
+    '''
+
+    The Decimal grade of a value stored in the tree.
 
+    >>> _as_grade(-5.0), _as_grade(4.23), _as_grade(float(INFINITY)) == INFINITY
+    (Decimal('-5'), Decimal('4.23'), True)
 
-class MoveNode(RootMoveNode):
     '''
+    return Decimal(int(value)) if value.is_integer() else Decimal(repr(value))
 
-    >>> parent_move = Move('e2e4')
-    >>> parent_move_node = RootMoveNode(parent_move)
-
-    >>> move = Move('d7d6')
-    >>> move_node = MoveNode(move, parent_move_node, Decimal('-100'))
-
-    >>> move_node # doctest: +ELLIPSIS
-    MoveNode(Move(Coordinate(3, 6), Coordinate(3, 5), False), RootMoveNode(...), Decimal('-100'))
-    >>> str(move_node)
-    'MoveNode for d7d6'
-    >>> move_node.move
-    Move(Coordinate(3, 6), Coordinate(3, 5), False)
-    >>> move_node.parent # doctest: +ELLIPSIS
-    RootMoveNode(...)
-    >>> move_node.children
-    []
-
-    >>> move_node.grade
-    Decimal('-100')
-    >>> move_node.parent.grade
-    Decimal('100')
-    >>> move_node.grade = Decimal('-200')
-    >>> move_node.grade
-    Decimal('-200')
-    >>> move_node.parent.grade
-    Decimal('200')
-
-    >>> list(move_node.moves_chain) # doctest: +NORMALIZE_WHITESPACE
-    [Move(Coordinate(4, 1), Coordinate(4, 3), False),
-     Move(Coordinate(3, 6), Coordinate(3, 5), False)]
 
+class TreeOfMoves:
     '''
-    def __init__(self, move, parent, grade=Decimal('0')):
-        super().__init__(move, grade)
-        self._parent = weakref.ref(parent)
-        self._parent().children.append(self)
 
-        self._parent()._update_grade()
+    The search tree kept level by level in parallel arrays, so a node is
+    an index rather than an object. The children of a node are added
+    together, so they are the contiguous indices from its first child.
+
+    >>> root_moves = [Move('a2a3'), Move('a2a4')]
+    >>> tree_of_moves = TreeOfMoves(root_moves)
+
+    >>> tree_of_moves # doctest: +ELLIPSIS
+    TreeOfMoves([Move(...), Move(...)])
+    >>> str(tree_of_moves)
+    'TreeOfMoves with 2 nodes in 1 levels'
+    >>> tree_of_moves[0]
+    range(0, 2)
+    >>> tree_of_moves.move(1), tree_of_moves.parent(1), tree_of_moves.grade(1)
+    (Move(Coordinate(0, 1), Coordinate(0, 3), False), -1, Decimal('0'))
+
+    >>> tree_of_moves.add_level()
+    >>> tree_of_moves.add_node(1, Move('a7a6'), Decimal('-15'))
+    2
+    >>> tree_of_moves.add_level()
+    >>> tree_of_moves.add_node(2, Move('a4a5'), Decimal('20'))
+    3
+    >>> tree_of_moves[1], tree_of_moves[2], tree_of_moves.children(2)
+    (range(2, 3), range(3, 4), range(3, 4))
+    >>> [str(move) for move in tree_of_moves.moves_chain(3)]
+    ['a2a4', 'a7a6', 'a4a5']
+    >>> tree_of_moves.bytes_per_node
+    24
+
+    '''
+    def __init__(self, root_moves, random=None):
+        self._random = random if random is not None else Random()
+        self._root_moves = root_moves
+
+        self._parents = array('i')
+        self._moves = array('H')
+        self._grades = array('d')
+        self._first_children = array('i')
+        self._child_counts = array('H')
+        self._best_children = array('i')
+
+        self._level_starts = [0]
+        for move in root_moves:
+            self._append(-1, move, Decimal('0'))
+
+    def _append(self, parent, move, grade):
+        self._parents.append(parent)
+        self._moves.append(move.code)
+        self._grades.append(float(grade))
+        self._first_children.append(-1)
+        self._child_counts.append(0)
+        self._best_children.append(-1)
+
+        return len(self._moves) - 1
+
+    def __getitem__(self, level_index):
+        start = self._level_starts[level_index]
+        if level_index + 1 < len(self._level_starts):
+            return range(start, self._level_starts[level_index + 1])
+
+        return range(start, len(self._moves))
+
+    def __len__(self):
+        return len(self._level_starts)
+
+    def add_level(self):
+        self._level_starts.append(len(self._moves))
+
+    def add_node(self, parent, move, grade=INFINITY):
+        '''
+
+        Add a child of parent to the last level and return its index.
+        A child graded INFINITY is ungraded and does not count for its
+        parent until it gets a grade.
+
+        '''
+        index = self._append(parent, move, grade)
+
+        if not self._child_counts[parent]:
+            self._first_children[parent] = index
+        self._child_counts[parent] += 1
+
+        if grade != INFINITY:
+            self._back_up(index, float(INFINITY))
+
+        return index
 
     @property
-    def parent(self):
-        return self._parent()
+    def root_moves(self):
+        return self._root_moves
 
     @property
-    def grade(self):
-        '''
+    def bytes_per_node(self):
+        return sum(
+            buffer.itemsize for buffer in (
+                self._parents, self._moves, self._grades,
+                self._first_children, self._child_counts, self._best_children
+            )
+        )
 
-        >>> root_move = Move('a2a3')
-        >>> root_move_node = RootMoveNode(root_move, Decimal('10'))
+    def move(self, index):
+        return Move.from_code(self._moves[index])
 
-        >>> parent_move = Move('a7a6')
-        >>> parent_move_node = MoveNode(parent_move, root_move_node, Decimal('-15'))
+    def parent(self, index):
+        return self._parents[index]
 
-        >>> move = Move('a3a4')
-        >>> move_node = MoveNode(move, parent_move_node, Decimal('20'))
+    def children(self, index):
+        first_child = self._first_children[index]
+        return range(first_child, first_child + self._child_counts[index])
 
-        >>> root_move_node.grade
-        Decimal('20')
-        >>> parent_move_node.grade
-        Decimal('-20')
-        >>> move_node.grade
-        Decimal('20')
+    def moves_chain(self, index):
+        codes = []
+        while index >= 0:
+            codes.append(self._moves[index])
+            index = self._parents[index]
+
+        for code in reversed(codes):
+            yield Move.from_code(code)
 
-        >>> move_node.grade = Decimal('-10')
-        >>> root_move_node.grade
-        Decimal('-10')
-        >>> parent_move_node.grade
-        Decimal('10')
-        >>> move_node.grade
-        Decimal('-10')
+    def grade(self, index):
+        return _as_grade(self._grades[index])
 
-        >>> parent_move_node.grade = Decimal('-100')
-        >>> root_move_node.grade
-        Decimal('100')
-        >>> parent_move_node.grade
-        Decimal('-100')
-        >>> move_node.grade
-        Decimal('-10')
+    def set_grade(self, index, grade):
+        '''
+
+        Set the grade of a node and back it up: a parent's grade is the
+        negated lowest grade of its graded children. The best child is
+        kept per node, so the update is constant time unless the best
+        child gets worse and its siblings are scanned again.
+
+        >>> tree_of_moves = TreeOfMoves([Move('a2a3')])
+        >>> tree_of_moves.set_grade(0, Decimal('10'))
+
+        >>> tree_of_moves.add_level()
+        >>> reply_a = tree_of_moves.add_node(0, Move('a7a6'))
+        >>> reply_b = tree_of_moves.add_node(0, Move('b7b6'), Decimal('5'))
+        >>> tree_of_moves.grade(0), tree_of_moves.best_child(0) == reply_b
+        (Decimal('-5'), True)
+        >>> tree_of_moves.set_grade(reply_a, Decimal('10'))
+        >>> tree_of_moves.grade(0), tree_of_moves.best_child(0) == reply_b
+        (Decimal('-5'), True)
+        >>> tree_of_moves.set_grade(reply_b, Decimal('20'))
+        >>> tree_of_moves.grade(0), tree_of_moves.best_child(0) == reply_a
+        (Decimal('-10'), True)
+
+        >>> tree_of_moves.add_level()
+        >>> reply_a_a = tree_of_moves.add_node(reply_a, Move('a3a4'), Decimal('-30'))
+        >>> tree_of_moves.grade(reply_a), tree_of_moves.grade(0)
+        (Decimal('30'), Decimal('-20'))
+        >>> tree_of_moves.set_grade(reply_a_a, Decimal('40'))
+        >>> tree_of_moves.grade(reply_a), tree_of_moves.grade(0)
+        (Decimal('-40'), Decimal('40'))
 
         '''
-        return self._grade
+        old_grade = self._grades[index]
+        self._grades[index] = float(grade)
+
+        self._back_up(index, old_grade)
 
-    @grade.setter
-    def grade(self, value):
-        self._grade = value
-        self._parent()._update_grade()
+    def _back_up(self, index, old_grade):
+        grades, parents, best_children = self._grades, self._parents, self._best_children
 
-    def _update_grade(self):
-        old_grade = self._grade
-        super()._update_grade()
+        parent = parents[index]
+        while parent >= 0 and grades[index] != old_grade:
+            best_child = best_children[parent]
 
-        if self._grade != old_grade:
-            self._parent()._update_grade()
+            if index == best_child:
+                if grades[index] > old_grade:
+                    best_child = best_children[parent] = min(self.children(parent), key=grades.__getitem__)
+
+            elif best_child < 0 or grades[index] < grades[best_child]:
+                best_child = best_children[parent] = index
+
+            else:
+                return
+
+            old_grade = grades[parent]
+            grades[parent] = -grades[best_child]
+
+            index, parent = parent, parents[parent]
+
+    def best_child(self, index):
+        return self._best_children[index]
 
     @property
-    def moves_chain(self):
+    def best_grade(self):
+        '''
+
+        >>> root_moves = [Move('a2a3'), Move('a2a4')]
+        >>> tree_of_moves = TreeOfMoves(root_moves)
+
+        >>> tree_of_moves.set_grade(0, Decimal('-20'))
+        >>> tree_of_moves.set_grade(1, Decimal('10'))
+        >>> tree_of_moves.best_grade
+        Decimal('20')
+        >>> tree_of_moves.best_move
+        Move(Coordinate(0, 1), Coordinate(0, 2), False)
+
         '''
+        return _as_grade(-min(self._grades[index] for index in self[0]))
+
+    @property
+    def best_move(self):
+        grades = self._grades
+        min_grade = min(grades[index] for index in self[0])
+        best_moves = [
+            self.move(index) for index in self[0] if grades[index] == min_grade
+        ]
+
+        return self._random.choice(best_moves)
 
-        >>> root_move = Move('a2a3')
-        >>> root_move_node = RootMoveNode(root_move)
+    def variation(self, move):
+        '''
 
-        >>> parent_move = Move('a7a6')
-        >>> parent_move_node = MoveNode(parent_move, root_move_node)
+        >>> root_moves = [Move('a2a3'), Move('a2a4')]
+        >>> tree_of_moves = TreeOfMoves(root_moves)
 
-        >>> move = Move('a3a4')
-        >>> move_node = MoveNode(move, parent_move_node)
+        >>> tree_of_moves.add_level()
+        >>> reply_a = tree_of_moves.add_node(0, Move('a7a6'), Decimal('5'))
+        >>> reply_b = tree_of_moves.add_node(0, Move('b7b6'), Decimal('-5'))
+        >>> reply_c = tree_of_moves.add_node(0, Move('c7c6'))
 
-        >>> list(move_node.moves_chain) # doctest: +NORMALIZE_WHITESPACE
-        [Move(Coordinate(0, 1), Coordinate(0, 2), False),
-         Move(Coordinate(0, 6), Coordinate(0, 5), False),
-         Move(Coordinate(0, 2), Coordinate(0, 3), False)]
-        >>> list(move_node.moves_chain) # doctest: +ELLIPSIS
-        [Move(...), Move(...), Move(...)]
+        >>> [str(move) for move in tree_of_moves.variation(Move('a2a3'))]
+        ['a2a3', 'b7b6']
+        >>> [str(move) for move in tree_of_moves.variation(Move('a2a4'))]
+        ['a2a4']
 
         '''
-        yield from self._parent().moves_chain
-        yield self._move
+        for index in self[0]:
+            if self.move(index) == move:
+                break
+        else:
+            return
+
+        while index >= 0:
+            yield self.move(index)
+
+            index = self._best_children[index]
 
     def __str__(self):
-        return f'{type(self).__name__} for {self._move}'
+        return f'{type(self).__name__} with {len(self._moves)} nodes in {len(self)} levels'
 
     def __repr__(self):
-        return f'{type(self).__name__}({self._move!r}, {self._parent()!r}, {self._grade!r})'
+        return f'{type(self).__name__}({self._root_moves!r})'
 
 
-class TreeOfMoves:
+class EvaluationCache:
     '''
 
-    >>> root_moves = [Move('a2a3'), Move('a2a4')]
-    >>> tree_of_moves = TreeOfMoves(root_moves)
+    Direct-mapped cache of estimates indexed by the low bits of the
+    position key. Each entry keeps the high 32 bits of the key to
+    verify a hit. The entries are allocated on first use.
 
-    >>> tree_of_moves # doctest: +ELLIPSIS
-    TreeOfMoves([Move(...), Move(...)])
-    >>> str(tree_of_moves)
-    'TreeOfMoves'
+    >>> evaluation_cache = EvaluationCache(1)
+
+    >>> evaluation_cache
+    EvaluationCache(size=1)
+    >>> str(evaluation_cache)
+    'EvaluationCache with 0 of 4096 entries used'
+    >>> key = Position.starting_position().key
+    >>> evaluation_cache.probe(key) is None
+    True
+    >>> evaluation_cache.store(key, Decimal('0.2'))
+    >>> evaluation_cache.probe(key)
+    Decimal('0.2')
+    >>> evaluation_cache.probe(key ^ (1 << 40)) is None
+    True
+    >>> evaluation_cache.hits, evaluation_cache.probes
+    (1, 3)
+    >>> str(evaluation_cache)
+    'EvaluationCache with 1 of 4096 entries used'
+
+    A size of 0 turns the cache off.
+
+    >>> evaluation_cache = EvaluationCache(0)
+    >>> evaluation_cache.store(key, Decimal('0.2'))
+    >>> evaluation_cache.probe(key) is None
+    True
 
     '''
-    def __init__(self, root_moves):
-        self._levels = []
+    def __init__(self, size=EVAL_CACHE_SIZE):
+        self._size = size
+        self._entries = None
+        self._mask = 0
 
-        self._root_moves = root_moves
-        self._levels.append(
-            [RootMoveNode(move) for move in root_moves]
-        )
+        self._hits = 0
+        self._probes = 0
 
-    def __getitem__(self, level_index):
-        return self._levels[level_index]
+    def _allocate(self):
+        self._entries = [None] * self.capacity
+        self._mask = self.capacity - 1
 
-    def __len__(self):
-        return len(self._levels)
+        return self._entries
 
-    def add_level(self):
-        self._levels.append([])
+    def resize(self, size):
+        '''
+
+        Change the size in megabytes, dropping the entries only if it
+        differs.
+
+        >>> evaluation_cache = EvaluationCache(1)
+        >>> evaluation_cache.store(1, Decimal('0.2'))
+        >>> evaluation_cache.resize(1)
+        >>> evaluation_cache.probe(1)
+        Decimal('0.2')
+        >>> evaluation_cache.resize(2)
+        >>> evaluation_cache.probe(1) is None, evaluation_cache.capacity
+        (True, 8192)
 
-    def add_node(self, node):
-        self._levels[-1].append(node)
+        '''
+        if size != self._size:
+            self._size = size
+            self._entries = None
+
+    def probe(self, key):
+        entries = self._entries
+        if entries is None:
+            entries = self._allocate()
+
+        if not entries:
+            return None
+
+        self._probes += 1
+
+        entry = entries[key & self._mask]
+        if entry is not None and entry[0] == key >> 32:
+            self._hits += 1
+            return entry[1]
+
+        return None
+
+    def store(self, key, grade):
+        entries = self._entries
+        if entries is None:
+            entries = self._allocate()
+
+        if entries:
+            entries[key & self._mask] = (key >> 32, grade)
 
     @property
-    def root_moves(self):
-        return self._levels[0]
+    def size(self):
+        return self._size
 
     @property
-    def best_move(self):
-        max_grade = max(
-            -move_node.grade for move_node in self._levels[0]
-        )
-        best_moves = [
-            move_node.move for move_node in self._levels[0] if -move_node.grade == max_grade
-        ]
+    def capacity(self):
+        entries = self._size * 2 ** 20 // EVAL_CACHE_ENTRY_BYTES
+        return 1 << entries.bit_length() - 1 if entries else 0
 
-        return choice(best_moves)
+    @property
+    def hits(self):
+        return self._hits
+
+    @property
+    def probes(self):
+        return self._probes
 
     def __str__(self):
-        return f'{type(self).__name__}'
+        used = sum(1 for entry in self._entries or () if entry is not None)
+        return f'{type(self).__name__} with {used} of {self.capacity} entries used'
 
     def __repr__(self):
-        return f'{type(self).__name__}({self._root_moves!r})'
+        return f'{type(self).__name__}(size={self._size})'
 
 
 class Analyzer:
@@ -295,16 +502,90 @@ class Analyzer:
     True
     >>> analyzer.best_move
     EmptyMove()
+    >>> analyzer.nodes
+    0
+
+    >>> position = Position.from_fen(('4k3/8/8/8/8/8/4P3/4K3', 'w', '-', '-', '0', '1'))
+    >>> moves = set()
+    >>> for _ in range(5):
+    ...     analyzer = Analyzer(position, seed=0)
+    ...     analyzer.search(plies=0)
+    ...     moves.add(str(analyzer.best_move))
+    >>> len(moves)
+    1
 
     '''
-    def __init__(self, position):
+    _play = staticmethod(Position.move)
+
+    def __init__(self, position, seed=None, tables=None):
         self._position = position
+        self._random = Random(seed)
 
-        self._ready = True
         self._best_move = EmptyMove()
+        self._ponder_move = EmptyMove()
+
+        self._stop_event = Event()
+        self._finished = Event()
+        self._finished.set()
+        self._running = False
+        self._search_thread = None
+        self._timer = None
+        self._on_finish = None
+        self._tree_of_moves = None
+        self._plies = 0
+
+        self._nodes = 0
+        self._depth = 0
+        self._max_nodes = None
+        self._mate = None
+
+        self._statistics = None
+        self._on_info = None
+        self._profile = None
+        self._profile_hz = PROFILE_HZ
+
+        self._on_report = None
+        self._limits = {}
+        self._move_time = None
+        self._start_time = None
+        self._move_time_start = None
+        self._best_move_changes = 0
+
+        self._move_buffers = [[] for _ in range(MOVE_BUFFER_LEVELS)]
+        self._figure_buffers = [[] for _ in range(MOVE_BUFFER_LEVELS)]
+        self._traced = None
+        self._futility_margin = FUTILITY_MARGIN
+
+        if tables is None:
+            tables = (PawnTable(), EvaluationCache())
+        self._pawn_table, self._evaluation_cache = tables
+
+    @staticmethod
+    def _buffer(buffers, level):
+        while len(buffers) <= level:
+            buffers.append([])
+
+        return buffers[level]
+
+    def _candidate_moves(self, position, level=0):
+        '''
+
+        Moves are generated into the buffer of the given nesting level:
+        a generation made while the moves of level are still in use goes
+        to level + 1. The buffer is reused by the next generation at the
+        same level.
+
+        >>> analyzer = Analyzer(Position.from_fen(('4k3/8/8/8/8/8/8/4K2R', 'w', 'K', '-', '0', '1')))
 
-    def _candidate_moves(self, position):
-        moves = []
+        >>> moves = analyzer._candidate_moves(analyzer.position)
+        >>> len(moves), moves is analyzer._candidate_moves(analyzer.position)
+        (15, True)
+        >>> moves is analyzer._candidate_moves(analyzer.position, level=1)
+        False
+
+        '''
+        moves = self._buffer(self._move_buffers, level)
+        moves.clear()
 
         for x in range(8):
             for y in range(8):
@@ -312,10 +593,56 @@ class Analyzer:
                 cell = position.board[coordinate]
 
                 if isinstance(cell, Figure) and cell.color == position.turn:
-                    moves += cell.available_moves(coordinate, position)
+                    cell.available_moves(coordinate, position, moves)
 
         return moves
 
+    def _staged_moves(self, position, level=0, quiet=True):
+        '''
+
+        The moves of _candidate_moves, generated one figure at a time:
+        captures of figures are yielded as soon as their figure is
+        generated, quiet moves only once every figure is, and not at all
+        without quiet. A caller that stops at the first capture it looks
+        for skips generating the remaining figures.
+
+        >>> analyzer = Analyzer(Position.from_fen(('4k3/8/8/8/8/8/3r4/3QK3', 'b', '-', '-', '0', '1')))
+        >>> position = analyzer.position
+
+        >>> [str(move) for move in analyzer._staged_moves(position)][:3]
+        ['d2d1', 'd2c2', 'd2b2']
+        >>> sorted(map(str, analyzer._staged_moves(position))) == sorted(map(str, analyzer._candidate_moves(position)))
+        True
+        >>> [str(move) for move in analyzer._staged_moves(position, quiet=False)]
+        ['d2d1']
+        >>> moves = analyzer._candidate_moves(position, level=5)
+        >>> [str(move) for move in analyzer._staged_moves(position, level=5, quiet=False)]
+        ['d2d1']
+
+        '''
+        quiet_moves = self._buffer(self._move_buffers, level)
+        figure_moves = self._buffer(self._figure_buffers, level)
+        quiet_moves.clear()
+        board, cells = position.board, position.board.cells
+
+        for x in range(8):
+            for y in range(8):
+                coordinate = Coordinate(x, y)
+                cell = board[coordinate]
+
+                if isinstance(cell, Figure) and cell.color == position.turn:
+                    figure_moves.clear()
+                    cell.available_moves(coordinate, position, figure_moves)
+
+                    for move in figure_moves:
+                        finish = move.finish
+                        if cells[finish.x][finish.y] is not EMPTY:
+                            yield move
+                        elif quiet:
+                            quiet_moves.append(move)
+
+        yield from quiet_moves
+
     def _check_check(self, opponents_position, opponents_candidate_moves):
         for move in opponents_candidate_moves:
             finish = move.finish
@@ -327,10 +654,10 @@ class Analyzer:
         else:
             return False
 
-    def _check_attack(self, position, coordinate):
+    def _check_attack(self, position, coordinate, level=0):
         opponents_position = position.deepcopy()
-        opponents_position.move(EmptyMove())
-        opponents_candidate_moves = self._candidate_moves(opponents_position)
+        self._play(opponents_position, EmptyMove())
+        opponents_candidate_moves = self._candidate_moves(opponents_position, level + 1)
 
         for move in opponents_candidate_moves:
             if move.finish == coordinate:
@@ -339,21 +666,27 @@ class Analyzer:
         else:
             return False
 
-    def _filter_checks(self, position, moves):
-        legal_moves = []
+    def _filter_checks(self, position, moves, level=0):
+        legal_count = 0
 
         for move in moves:
+            self._check_stop()
+
             opponents_position = position.deepcopy()
-            opponents_position.move(move)
-            opponents_candidate_moves = self._candidate_moves(opponents_position)
+            self._play(opponents_position, move)
 
-            if not self._check_check(opponents_position, opponents_candidate_moves):
-                legal_moves.append(move)
+            opponents_captures = self._staged_moves(opponents_position, level + 1, quiet=False)
 
-        return legal_moves
+            if not self._check_check(opponents_position, opponents_captures):
+                moves[legal_count] = move
+                legal_count += 1
 
-    def _filter_castlings(self, position, moves):
-        legal_moves = []
+        del moves[legal_count:]
+
+        return moves
+
+    def _filter_castlings(self, position, moves, level=0):
+        legal_count = 0
 
         for move in moves:
             start = move.start
@@ -371,23 +704,64 @@ class Analyzer:
 
                 else:
                     if not(
-                        self._check_attack(position, start) or
-                        self._check_attack(position, start.delta(x=delta_x))
+                        self._check_attack(position, start, level) or
+                        self._check_attack(position, start.delta(x=delta_x), level)
                     ):
-                        legal_moves.append(move)
+                        moves[legal_count] = move
+                        legal_count += 1
 
             else:
-                legal_moves.append(move)
+                moves[legal_count] = move
+                legal_count += 1
 
-        return legal_moves
+        del moves[legal_count:]
 
-    def _filter_illegal_moves(self, position, moves):
-        legal_moves = moves
+        return moves
 
-        legal_moves = self._filter_checks(position, legal_moves)
-        legal_moves = self._filter_castlings(position, legal_moves)
+    def _filter_illegal_moves(self, position, moves, level=0):
+        '''
 
-        return legal_moves
+        Illegal moves are removed in place.
+
+        >>> analyzer = Analyzer(Position.from_fen(('4k3/8/8/8/8/8/3r4/4K3', 'w', '-', '-', '0', '1')))
+
+        >>> moves = analyzer._candidate_moves(analyzer.position)
+        >>> analyzer._filter_illegal_moves(analyzer.position, moves) is moves
+        True
+        >>> [str(move) for move in moves]
+        ['e1d2', 'e1f1']
+
+        '''
+        self._filter_checks(position, moves, level)
+        self._filter_castlings(position, moves, level)
+
+        return moves
+
+    def _order_moves(self, position, moves):
+        '''
+
+        Put winning and even captures first, best exchange first, then
+        quiet moves, then captures that lose material.
+
+        >>> position = Position.from_fen(('4k3/8/2p5/1n1p4/4P3/8/8/1Q2K3', 'w', '-', '-', '0', '1'))
+        >>> analyzer = Analyzer(position)
+
+        >>> moves = [Move('e1e2'), Move('b1b5'), Move('e4d5'), Move('b1d3')]
+        >>> [str(move) for move in analyzer._order_moves(position, moves)]
+        ['e4d5', 'e1e2', 'b1d3', 'b1b5']
+
+        '''
+        def key(move):
+            if not position.is_capture(move) and not move.is_promotion():
+                return 1, 0
+
+            see = position.see(move)
+
+            return (0 if see >= 0 else 2), -see
+
+        moves.sort(key=key)
+
+        return moves
 
     def _count_figures(self, position):
         grades = {'current_player': Decimal('0'), 'opponent': Decimal('0')}
@@ -405,117 +779,760 @@ class Analyzer:
 
         return grades
 
-    def _estimate(self, position, available_moves):
-        grade = Decimal('0')
+    def _estimate(self, position, available_moves, level=0):
+        '''
+
+        >>> analyzer = Analyzer(Position.from_fen(('4k3/8/8/8/8/8/8/R3K3', 'w', '-', '-', '100', '80')))
+        >>> position = analyzer.position
+
+        >>> analyzer._estimate(position, analyzer._candidate_moves(position))
+        Decimal('0')
+
+        '''
+        if self._is_draw(position):
+            return DRAW_GRADE
+
+        key = position.key
+        grade = self._probe_evaluation(key)
+        if grade is not None:
+            return grade
 
         opponents_position = position.deepcopy()
-        opponents_position.move(EmptyMove())
-        opponents_candidate_moves = self._candidate_moves(opponents_position)
+        self._play(opponents_position, EmptyMove())
+        opponents_candidate_moves = self._candidate_moves(opponents_position, level + 1)
 
         if not available_moves:
             if self._check_check(opponents_position, opponents_candidate_moves):
-                grade = Decimal('-300')
+                grade = -MATE_GRADE
             else:
                 grade = Decimal('0')
 
         else:
             opponents_available_moves = self._filter_illegal_moves(
-                opponents_position, opponents_candidate_moves
+                opponents_position, opponents_candidate_moves, level + 1
             )
-            figures = self._count_figures(position)
 
             grade = (
-                (figures['current_player'] - figures['opponent']) +
+                self._static_grade(position) +
                 Decimal(len(available_moves) - len(opponents_available_moves)) / Decimal('100')
             )
 
+        self._evaluation_cache.store(key, grade)
+
         return grade
 
-    def _estimation_thread_target(self, tree_of_moves, root_position, max_depth):
+    def _is_draw(self, position):
+        '''
+
+        Drawn by the rules, or by material no side can mate with.
+
+        >>> analyzer = Analyzer(Position.from_fen(('4k3/8/8/8/8/8/8/2B1K3', 'w', '-', '-', '0', '1')))
+
+        >>> analyzer._is_draw(analyzer.position)
+        True
+
+        '''
+        if position.is_draw():
+            return True
+
+        if probe_material(position.board).draw:
+            if self._statistics is not None:
+                self._statistics.count('material_draws')
+            return True
+
+        return False
+
+    def _probe_evaluation(self, key):
+        hits = self._evaluation_cache.hits
+        grade = self._evaluation_cache.probe(key)
+
+        if self._statistics is not None:
+            self._statistics.count('eval_cache_probes')
+            self._statistics.count('eval_cache_hits', self._evaluation_cache.hits - hits)
+
+        return grade
+
+    def _static_grade(self, position):
+        '''
+
+        >>> analyzer = Analyzer(Position.from_fen(('4k3/1p6/8/3P1p2/8/P3P3/P7/4K3', 'b', '-', '-', '0', '1')))
+
+        >>> analyzer._static_grade(analyzer.position)
+        Decimal('-1.85')
+
+        Drawish material scales the grade down, and a lone king is
+        driven to the edge.
+
+        >>> analyzer = Analyzer(Position.from_fen(('4k3/4b3/8/8/8/8/8/R3K3', 'w', '-', '-', '0', '1')))
+        >>> analyzer._static_grade(analyzer.position)
+        Decimal('0.1250')
+        >>> analyzer = Analyzer(Position.from_fen(('7k/8/5K2/8/8/8/8/R7', 'b', '-', '-', '0', '1')))
+        >>> analyzer._static_grade(analyzer.position)
+        Decimal('-5.85')
+
+        '''
+        figures = self._count_figures(position)
+        material = probe_material(position.board)
+        pawn_grade = self._probe_pawns(position.board)[0]
+        endgame_grade = material.endgame_grade(position.board)
+
+        if position.turn != 'w':
+            pawn_grade, endgame_grade = -pawn_grade, -endgame_grade
+
+        return (figures['current_player'] - figures['opponent'] + pawn_grade) * material.scale + endgame_grade
+
+    def _probe_pawns(self, board):
+        hits = self._pawn_table.hits
+        pawns = self._pawn_table.probe(board)
+
+        if self._statistics is not None:
+            self._statistics.count('pawn_hash_probes')
+            self._statistics.count('pawn_hash_hits', self._pawn_table.hits - hits)
+
+        return pawns
+
+    def _futility_bound(self, position, available_moves):
+        '''
+
+        A grade _estimate cannot go below, computed without generating
+        the opponent's moves.
+
+        >>> analyzer = Analyzer(Position.from_fen(('4k3/8/8/8/8/8/8/R3K3', 'w', '-', '-', '0', '1')))
+        >>> position = analyzer.position
+        >>> moves = analyzer._filter_illegal_moves(position, analyzer._candidate_moves(position))
+
+        >>> analyzer._futility_bound(position, moves) <= analyzer._estimate(position, moves)
+        True
+
+        '''
+        return (
+            self._static_grade(position) +
+            Decimal(len(available_moves) - self._futility_margin) / Decimal('100')
+        )
+
+    def _instrument(self, statistics):
+        for name in TIMED_METHODS:
+            setattr(self, name, statistics.timed(name, getattr(self, name)))
+
+        for name in TIMED_GENERATORS:
+            setattr(self, name, statistics.timed_generator(name, getattr(self, name)))
+
+        filter_illegal_moves = statistics.timed(
+            '_filter_illegal_moves', type(self)._filter_illegal_moves.__get__(self)
+        )
+
+        def counted_filter_illegal_moves(position, moves, level=0):
+            candidate_count = len(moves)
+            legal_moves = filter_illegal_moves(position, moves, level)
+            statistics.count('legality_rejections', candidate_count - len(legal_moves))
+
+            return legal_moves
+
+        self._filter_illegal_moves = counted_filter_illegal_moves
+        self._play = statistics.timed('Position.move', Position.move)
+
+    def _uninstrument(self):
+        for name in TIMED_METHODS + TIMED_GENERATORS + ['_filter_illegal_moves', '_play']:
+            self.__dict__.pop(name, None)
+
+    def _report_statistics(self):
+        statistics = self._statistics
+
+        statistics.count('nodes', self._nodes)
+        statistics.count('depth', self._depth)
+        if self._depth:
+            statistics.count('ebf', self._nodes ** (1 / self._depth))
+
+        if self._traced is not None and self._nodes:
+            blocks, peak = self._traced
+            statistics.count('allocations_per_node', blocks / self._nodes)
+            statistics.count('peak_bytes_per_node', peak / self._nodes)
+
+        if self._on_info is not None:
+            for line in statistics.as_info():
+                self._on_info(line)
+
+    def _dump_profile(self, profiler):
+        try:
+            profiler.dump(self._profile)
+        except OSError as error:
+            if self._on_info is not None:
+                self._on_info(f'info string profile not written: {error}')
+
+    def _start_tracing(self):
+        started = not tracemalloc.is_tracing()
+        if started:
+            tracemalloc.start()
+
+        tracemalloc.reset_peak()
+        memory = tracemalloc.get_traced_memory()[0]
+
+        return started, memory, len(tracemalloc.take_snapshot().traces)
+
+    def _stop_tracing(self, tracing):
+        started, memory, blocks = tracing
+
+        peak = tracemalloc.get_traced_memory()[1]
+        self._traced = (
+            len(tracemalloc.take_snapshot().traces) - blocks,
+            peak - memory
+        )
+
+        if started:
+            tracemalloc.stop()
+
+    def _check_stop(self):
+        if self._stop_event.is_set():
+            raise SearchStopped
+
+    def _expand_tree(self, tree_of_moves, root_position, max_depth):
+        '''
+
+        Drawn positions, including those without mating material, are
+        graded at once and not expanded.
+
+        A leaf whose futility bound is already worse for the side
+        choosing it than a graded sibling cannot change its parent, so it
+        gets the bound instead of a full estimate.
+
+        >>> position = Position.from_fen(STARTING_POSITION_FEN, ['g1f3', 'g8f6', 'f3g1'])
+        >>> analyzer = Analyzer(position)
+
+        >>> analyzer.search(plies=2, search_moves=[Move('f6g8')])
+        >>> analyzer.nodes, analyzer._tree_of_moves.best_grade
+        (1, Decimal('0'))
+
+        >>> analyzer = Analyzer(Position.from_fen(('4k3/8/8/8/8/8/8/2B1K3', 'w', '-', '-', '0', '1')))
+
+        >>> analyzer.search(plies=3)
+        >>> analyzer.nodes, analyzer._tree_of_moves.best_grade
+        (12, Decimal('0'))
+
+        >>> position = Position.from_fen(('4k3/8/8/8/8/8/r7/R3K3', 'w', '-', '-', '0', '1'))
+        >>> analyzer = Analyzer(position, seed=0)
+
+        >>> analyzer.search(plies=2, search_moves=[Move('e1d1')], statistics=True)
+        >>> analyzer.statistics.counters['futility_prunes'] > 0
+        True
+        >>> pruned_grade = analyzer._tree_of_moves.best_grade
+        >>> analyzer.search(plies=2, search_moves=[Move('e1d1')], statistics=True, futility_margin=1000)
+        >>> analyzer.statistics.counters['futility_prunes']
+        0
+        >>> analyzer._tree_of_moves.best_grade == pruned_grade
+        True
+
+        '''
         index = 0
 
         for depth in range(max_depth):
-            if self._ready or not tree_of_moves[depth]:
+            if not tree_of_moves[depth]:
                 break
 
+            self._depth = depth + 1
+
             if depth != max_depth - 1:
                 tree_of_moves.add_level()
 
-            for move_node in tree_of_moves[depth]:
+            last_parent, sibling_best = None, None
+
+            for node in tree_of_moves[depth]:
+                self._check_stop()
+
+                parent = tree_of_moves.parent(node)
+                if parent != last_parent:
+                    last_parent, sibling_best = parent, None
+
                 opponents_position = root_position.deepcopy()
-                for chain_move in move_node.moves_chain:
-                    opponents_position.move(chain_move)
+                for chain_move in tree_of_moves.moves_chain(node):
+                    self._play(opponents_position, chain_move)
+
+                if self._is_draw(opponents_position):
+                    opponents_available_moves = []
+                    grade = DRAW_GRADE
+
+                else:
+                    opponents_candidate_moves = self._candidate_moves(opponents_position)
+                    opponents_available_moves = self._filter_illegal_moves(
+                        opponents_position, opponents_candidate_moves
+                    )
+
+                    grade = None
+                    if (
+                        depth == max_depth - 1 and
+                        sibling_best is not None and
+                        opponents_available_moves
+                    ):
+                        bound = self._futility_bound(opponents_position, opponents_available_moves)
+                        if bound > sibling_best:
+                            grade = bound
+                            if self._statistics is not None:
+                                self._statistics.count('futility_prunes')
 
-                if self._ready:
-                    break
+                    if grade is None:
+                        grade = self._estimate(opponents_position, opponents_available_moves)
 
-                opponents_candidate_moves = self._candidate_moves(opponents_position)
-                opponents_available_moves = self._filter_illegal_moves(
-                    opponents_position, opponents_candidate_moves
-                )
+                if parent >= 0 and (sibling_best is None or grade < sibling_best):
+                    sibling_best = grade
 
                 if depth != max_depth - 1:
+                    self._order_moves(opponents_position, opponents_available_moves)
+
                     for available_move in opponents_available_moves:
-                        new_node = MoveNode(available_move, move_node, INFINITY)
-                        tree_of_moves.add_node(new_node)
+                        tree_of_moves.add_node(node, available_move)
 
-                move_node.grade = self._estimate(opponents_position, opponents_available_moves)
+                tree_of_moves.set_grade(node, grade)
+                self._nodes += 1
 
                 if index % 10 == 0:
-                    self._best_move = tree_of_moves.best_move
+                    self._update_best_move(tree_of_moves.best_move)
                 index += 1
-                if self._ready:
-                    break
+                if self._limits_reached(tree_of_moves):
+                    return
+
+            self._report_depth(tree_of_moves)
+
+    def _report_depth(self, tree_of_moves):
+        '''
 
-        self._best_move = tree_of_moves.best_move
-        self._ready = True
+        Report the score and the principal variation of a completed level.
 
-    def _chosee_best_move(self, position, moves, depth):
-        tree_of_moves = TreeOfMoves(moves)
+        >>> position = Position.from_fen(('7k/7p/8/8/8/8/8/R3K3', 'w', '-', '-', '0', '1'))
+        >>> analyzer = Analyzer(position)
 
-        estimation_thread = Thread(
-            target=self._estimation_thread_target,
-            args=(tree_of_moves, position, depth),
+        >>> analyzer.search(plies=2, search_moves=[Move('a1a8')], on_info=print) # doctest: +ELLIPSIS
+        info depth 1 score cp 423 nodes 1 nps ... time ... pv a1a8
+        info depth 2 score cp 418 nodes 2 nps ... time ... pv a1a8 h8g7
 
-            daemon=True
+        >>> position = Position.from_fen(('6k1/5ppp/8/8/8/8/8/R5K1', 'w', '-', '-', '0', '1'))
+        >>> analyzer = Analyzer(position)
+
+        >>> analyzer.search(plies=1, search_moves=[Move('a1a8')], on_info=print) # doctest: +ELLIPSIS
+        info depth 1 score mate 1 nodes 1 nps ... time ... pv a1a8
+
+        '''
+        self._update_best_move(tree_of_moves.best_move)
+
+        if self._on_info is None:
+            return
+
+        variation = [str(move) for move in tree_of_moves.variation(self._best_move)]
+
+        grade = tree_of_moves.best_grade
+        if grade >= MATE_GRADE:
+            score = f'mate {(len(variation) + 1) // 2}'
+        elif grade <= -MATE_GRADE:
+            score = f'mate -{len(variation) // 2}'
+        else:
+            score = f'cp {int(grade * 100)}'
+
+        time_used = perf_counter() - self._start_time
+        nps = int(self._nodes / time_used) if time_used else 0
+
+        self._on_info(
+            f'info depth {self._depth} score {score} nodes {self._nodes} nps {nps} '
+            f'time {int(time_used * 1000)} pv {" ".join(variation)}'
         )
-        estimation_thread.start()
 
-    def go(self, depth=DEFAULT_DEPTH):
-        self._ready = False
+    def _limits_reached(self, tree_of_moves):
+        if self._max_nodes is not None and self._nodes >= self._max_nodes:
+            return True
+
+        if self._mate is not None and tree_of_moves.best_grade >= MATE_GRADE:
+            return True
+
+        return False
+
+    def _update_best_move(self, move):
+        if str(move) != str(self._best_move):
+            self._best_move_changes += 1
+
+        self._best_move = move
+
+    def _report(self):
+        finish_time = perf_counter()
+        time_used = finish_time - self._start_time
+
+        time_used_on_clock = None
+        if self._move_time_start is not None:
+            time_used_on_clock = finish_time - self._move_time_start
+
+        tt_hit_rate = None
+        if self._statistics is not None and self._statistics.counters['tt_probes']:
+            tt_hit_rate = self._statistics.ratio('tt_hits', 'tt_probes')
+
+        return {
+            'fen': str(self._position),
+            'limits': self._limits,
+            'depth': self._depth,
+            'nodes': self._nodes,
+            'nps': int(self._nodes / time_used) if time_used else 0,
+            'time_used': time_used,
+            'time_allocated': self._move_time,
+            'time_used_on_clock': time_used_on_clock,
+            'tt_hit_rate': tt_hit_rate,
+            'best_move': str(self._best_move),
+            'best_move_changes': self._best_move_changes,
+        }
+
+    def _finish(self):
+        if self._timer is not None:
+            self._timer.cancel()
+
+        if self._statistics is not None:
+            self._report_statistics()
+
+        if self._on_report is not None:
+            self._on_report(self._report())
+
+        if self._on_finish is not None:
+            self._on_finish(self._best_move, self._ponder_move)
+
+        if self._tree_of_moves is not None:
+            collect_garbage()
+
+        self._running = False
+        self._finished.set()
+
+    def prepare(self, depth=DEFAULT_DEPTH, plies=None, nodes=None, mate=None, search_moves=None,
+                move_time=None, on_finish=None, statistics=False, on_info=None,
+                profile=None, profile_hz=PROFILE_HZ, on_report=None,
+                futility_margin=FUTILITY_MARGIN, eval_cache=EVAL_CACHE_SIZE):
+        '''
+
+        >>> position = Position.from_fen(('6k1/5ppp/8/8/8/8/8/R5K1', 'w', '-', '-', '0', '1'))
+        >>> analyzer = Analyzer(position)
+
+        >>> analyzer.prepare(mate=3)
+        >>> analyzer.plies
+        5
+        >>> analyzer.prepare(plies=2, mate=3)
+        >>> analyzer.plies
+        2
+        >>> analyzer.prepare(mate=1)
+        >>> analyzer.ready
+        False
+        >>> analyzer.run()
+        >>> analyzer.ready
+        True
+        >>> analyzer.best_move
+        Move(Coordinate(0, 0), Coordinate(0, 7), False)
+
+        >>> analyzer.prepare(plies=1, statistics=True, on_info=print)
+        >>> analyzer.run() # doctest: +ELLIPSIS
+        info depth 1 score mate 1 nodes 17 nps ... time ... pv a1a8
+        info string legality_rejections 8
+        info string eval_cache_probes 17
+        info string eval_cache_hits 12
+        info string pawn_hash_probes 5
+        info string pawn_hash_hits 5
+        info string nodes 17
+        info string depth 1
+        info string ebf 17.00
+        info string allocations_per_node ...
+        info string peak_bytes_per_node ...
+        info string time _candidate_moves ... s in 23 calls
+        info string time Position.move ... s in 270 calls
+        info string time _staged_moves ... s in 248 calls
+        info string time _filter_illegal_moves ... s in 23 calls
+        info string time _estimate ... s in 17 calls
+        >>> analyzer.statistics.counters['nodes']
+        17
+
+        >>> analyzer.prepare(plies=1)
+        >>> analyzer.statistics is None, '_estimate' in vars(analyzer)
+        (True, False)
+
+        >>> reports = []
+        >>> analyzer.prepare(plies=1, move_time=5, on_report=reports.append)
+        >>> analyzer.run()
+        >>> report = reports[0]
+        >>> report['fen'], report['limits'], report['depth'], report['nodes']
+        ('6k1/5ppp/8/8/8/8/8/R5K1 w - - 0 1', {'plies': 1, 'nodes': None, 'mate': None, 'search_moves': None, 'move_time': 5}, 1, 17)
+        >>> report['time_used'] < report['time_allocated'], report['nps'] > 0
+        (True, True)
+        >>> report['time_used_on_clock'] <= report['time_used']
+        True
+        >>> report['tt_hit_rate'], report['best_move'] == str(analyzer.best_move)
+        (None, True)
+
+        '''
+        if self._running:
+            self.stop()
+            self.wait()
+
+        self._stop_event.clear()
+        self._finished.clear()
+
+        self._nodes = 0
+        self._depth = 0
+        self._max_nodes = nodes
+        self._mate = mate
+        self._on_finish = on_finish
+        self._on_info = on_info
+        self._profile = profile
+        self._profile_hz = profile_hz
+        self._on_report = on_report
+        self._futility_margin = futility_margin
+
+        self._evaluation_cache.resize(eval_cache)
+
+        self._uninstrument()
+        self._statistics = None
+        self._traced = None
+        if statistics:
+            self._statistics = SearchStatistics()
+            self._instrument(self._statistics)
+
+        self._start_time = perf_counter()
+        self._move_time = None
+        self._move_time_start = None
+        self._best_move_changes = 0
+
+        if self._timer is not None:
+            self._timer.cancel()
+        self._timer = None
+        self._tree_of_moves = None
+        self._ponder_move = EmptyMove()
+
+        if mate is not None:
+            plies = mate * 2 - 1 if plies is None else min(plies, mate * 2 - 1)
+        elif plies is None:
+            plies = depth * 2
+        self._plies = plies
+
+        self._limits = {
+            'plies': plies,
+            'nodes': nodes,
+            'mate': mate,
+            'search_moves': [str(move) for move in search_moves] if search_moves else None,
+            'move_time': move_time,
+        }
 
         position = self._position
 
         available_moves = self._candidate_moves(position)
-        available_moves = self._filter_illegal_moves(position, available_moves)
+        available_moves = list(self._filter_illegal_moves(position, available_moves))
+        self._order_moves(position, available_moves)
+
+        if search_moves:
+            available_moves = [
+                move for move in available_moves if move in search_moves
+            ]
 
         if not available_moves:
             self._best_move = EmptyMove()
-            self._ready = True
-
-        elif depth == 0:
-            self._best_move = choice(available_moves)
-            self._ready = True
 
         else:
-            self._best_move = choice(available_moves)
-            self._chosee_best_move(position, available_moves, depth * 2)
+            self._best_move = self._random.choice(available_moves)
+
+            if plies != 0:
+                self._tree_of_moves = TreeOfMoves(available_moves, self._random)
+
+                if move_time is not None:
+                    self.set_move_time(move_time)
+
+    def run(self):
+        '''
+
+        >>> import os, tempfile
+
+        >>> position = Position.from_fen(('6k1/5ppp/8/8/8/8/8/R5K1', 'w', '-', '-', '0', '1'))
+        >>> analyzer = Analyzer(position)
+
+        >>> with tempfile.TemporaryDirectory() as directory:
+        ...     path = os.path.join(directory, 'search.stacks')
+        ...     analyzer.prepare(plies=1, profile=path, profile_hz=200)
+        ...     analyzer.run()
+        ...     with open(path) as stacks_file:
+        ...         stacks = stacks_file.read()
+        >>> 'engine.analyzer.Analyzer.run;engine.analyzer.Analyzer._expand_tree;' in stacks
+        True
+
+        >>> analyzer.prepare(plies=1, profile='/nonexistent/search.stacks', on_info=print)
+        >>> analyzer.run() # doctest: +ELLIPSIS
+        info depth 1 score mate 1 nodes 17 nps ... time ... pv a1a8
+        info string profile not written: [Errno 2] No such file or directory: '/nonexistent/search.stacks'
+        >>> analyzer.ready, analyzer.nodes
+        (True, 17)
+
+        '''
+        self._running = True
+        tree_of_moves = self._tree_of_moves
+
+        try:
+            if tree_of_moves is not None:
+                profiler = None
+                if self._profile:
+                    profiler = SamplingProfiler(get_ident(), self._profile_hz)
+                    profiler.start()
+
+                tracing = None
+                if self._statistics is not None:
+                    tracing = self._start_tracing()
+
+                try:
+                    with paused_collection():
+                        self._expand_tree(tree_of_moves, self._position, self._plies)
+                except SearchStopped:
+                    pass
+                finally:
+                    if tracing is not None:
+                        self._stop_tracing(tracing)
+
+                    if profiler is not None:
+                        profiler.stop()
+                        self._dump_profile(profiler)
+
+                self._update_best_move(tree_of_moves.best_move)
+
+                variation = list(tree_of_moves.variation(self._best_move))
+                if len(variation) > 1:
+                    self._ponder_move = variation[1]
+
+        finally:
+            self._finish()
+
+    def search(self, **limits):
+        self.prepare(**limits)
+        self.run()
+
+    def go(self, **limits):
+        '''
+
+        >>> position = Position.from_fen(('6k1/5ppp/8/8/8/8/8/R5K1', 'w', '-', '-', '0', '1'))
+        >>> analyzer = Analyzer(position)
+
+        >>> analyzer.go(mate=1); analyzer.wait()
+        True
+        >>> analyzer.ready
+        True
+        >>> analyzer.best_move
+        Move(Coordinate(0, 0), Coordinate(0, 7), False)
+
+        >>> analyzer.go(plies=1, nodes=3); analyzer.wait()
+        True
+        >>> analyzer.nodes
+        3
+
+        >>> analyzer.go(plies=1, search_moves=[Move('g1h1'), Move('g1f1')]); analyzer.wait()
+        True
+        >>> analyzer.nodes
+        2
+        >>> analyzer.best_move in [Move('g1h1'), Move('g1f1')]
+        True
+
+        >>> analyzer.go(move_time=0.01, on_finish=lambda *moves: print('finished')); analyzer.wait()
+        finished
+        True
+
+        >>> position = Position.from_fen(('7k/7p/8/8/8/8/8/R3K3', 'w', '-', '-', '0', '1'))
+        >>> analyzer = Analyzer(position)
+
+        >>> analyzer.go(plies=2, search_moves=[Move('a1a8')]); analyzer.wait()
+        True
+        >>> str(analyzer.best_move), str(analyzer.ponder_move)
+        ('a1a8', 'h8g7')
+
+        '''
+        self.prepare(**limits)
+
+        self._running = True
+        self._search_thread = Thread(target=self.run, daemon=True)
+        self._search_thread.start()
+
+    def set_move_time(self, move_time):
+        '''
+
+        >>> from time import sleep
+
+        >>> position = Position.from_fen(('6k1/5ppp/8/8/8/8/8/R5K1', 'w', '-', '-', '0', '1'))
+        >>> analyzer = Analyzer(position)
+
+        >>> analyzer.search(plies=0)
+        >>> analyzer.set_move_time(0.01)
+        >>> analyzer.prepare(plies=1); sleep(0.05); analyzer.run()
+        >>> analyzer.nodes
+        17
+
+        A pondering search gets its time at ponderhit, and the time it
+        has used on the clock is counted from then.
+
+        >>> reports = []
+        >>> analyzer.prepare(plies=1, on_report=reports.append); sleep(0.05)
+        >>> analyzer.set_move_time(5); analyzer.run()
+        >>> reports[0]['time_used_on_clock'] < 0.05 < reports[0]['time_used']
+        True
+
+        '''
+        if self._finished.is_set():
+            return
+
+        if self._timer is not None:
+            self._timer.cancel()
+
+        self._move_time = move_time
+        self._move_time_start = perf_counter()
+
+        self._timer = Timer(move_time, self.stop)
+        self._timer.daemon = True
+        self._timer.start()
 
     def stop(self):
-        self._ready = True
+        self._stop_event.set()
+
+    def wait(self, timeout=None):
+        return self._finished.wait(timeout)
 
     @property
     def best_move(self):
         return self._best_move
 
+    @property
+    def ponder_move(self):
+        return self._ponder_move
+
     @property
     def ready(self):
-        return self._ready
+        return self._finished.is_set()
+
+    @property
+    def nodes(self):
+        return self._nodes
+
+    @property
+    def depth(self):
+        return self._depth
+
+    @property
+    def plies(self):
+        return self._plies
+
+    @property
+    def statistics(self):
+        return self._statistics
+
+    @property
+    def tables(self):
+        '''
+
+        The pawn table and the evaluation cache, to share with the next
+        analyzer.
+
+        >>> analyzer = Analyzer(Position.starting_position())
+        >>> Analyzer(analyzer.position, tables=analyzer.tables).tables == analyzer.tables
+        True
+
+        '''
+        return self._pawn_table, self._evaluation_cache
 
     @property
     def position(self):
         return self._position
 
+    @position.setter
+    def position(self, position):
+        self._position = position
+
     def __str__(self):
         return f'{type(self).__name__} for {self._position}'
 
@@ -0,0 +1,60 @@
+import doctest
+from time import perf_counter
+
+try:
+    from .analyzer import *
+except (SystemError, ImportError):
+    from analyzer import *
+
+BENCH_PLIES = 2
+BENCH_SEED = 0
+
+BENCH_POSITIONS = [
+    ('rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP/RNBQKBNR', 'w', 'KQkq', '-', '0', '1'),
+    ('8/2p5/3p4/KP5r/1R3p1k/8/4P1P1/8', 'w', '-', '-', '0', '1'),
+    ('6k1/5ppp/8/8/8/8/5PPP/3R2K1', 'w', '-', '-', '0', '1'),
+    ('8/8/4k3/8/2Q5/8/4K3/8', 'w', '-', '-', '0', '1'),
+    ('4k3/8/8/8/8/8/4P3/4K3', 'w', '-', '-', '0', '1'),
+]
+
+
+def bench(plies=BENCH_PLIES, output=print):
+    '''
+
+    >>> nodes, seconds = bench(1) # doctest: +ELLIPSIS
+    Position 1/5: rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP/RNBQKBNR w KQkq - 0 1
+    Position 2/5: 8/2p5/3p4/KP5r/1R3p1k/8/4P1P1/8 w - - 0 1
+    Position 3/5: 6k1/5ppp/8/8/8/8/5PPP/3R2K1 w - - 0 1
+    Position 4/5: 8/8/4k3/8/2Q5/8/4K3/8 w - - 0 1
+    Position 5/5: 4k3/8/8/8/8/8/4P3/4K3 w - - 0 1
+    ===========================
+    Total time (ms) : ...
+    Nodes searched  : 89
+    Nodes/second    : ...
+    >>> nodes
+    89
+
+    '''
+    nodes, seconds = 0, 0.0
+
+    for index, fen_position in enumerate(BENCH_POSITIONS):
+        output(f'Position {index + 1}/{len(BENCH_POSITIONS)}: {" ".join(fen_position)}')
+
+        analyzer = Analyzer(Position.from_fen(fen_position), seed=BENCH_SEED)
+
+        start_time = perf_counter()
+        analyzer.search(plies=plies)
+        seconds += perf_counter() - start_time
+
+        nodes += analyzer.nodes
+
+    output('===========================')
+    output(f'Total time (ms) : {int(seconds * 1000)}')
+    output(f'Nodes searched  : {nodes}')
+    output(f'Nodes/second    : {int(nodes / seconds) if seconds else 0}')
+
+    return nodes, seconds
+
+
+if __name__ == '__main__':
+    doctest.testmod()
@@ -1,17 +1,50 @@
 import doctest
 from decimal import Decimal
+from random import Random
 
 try:
-    from .primitives import Coordinate, EmptyCell, EmptyMove
+    from .primitives import EMPTY, SQUARES, Coordinate, EmptyCell, EmptyMove
 except (ImportError, SystemError):
-    from primitives import Coordinate, EmptyCell, EmptyMove
+    from primitives import EMPTY, SQUARES, Coordinate, EmptyCell, EmptyMove
 
 STARTING_POSITION_FEN = ('rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP/RNBQKBNR', 'w', 'KQkq', '-', '0', '1')
 
+PROMOTION_SYMBOLS = ' qrbn'
+
+# Interned moves, keyed both by code and by UCI string.
+MOVES = {}
+
+FIFTY_MOVES_PLIES = 100
+
+PARALLEL_DELTAS = [(-1, 0), (1, 0), (0, -1), (0, 1)]
+DIAGONAL_DELTAS = [(-1, -1), (-1, 1), (1, -1), (1, 1)]
+KING_DELTAS = PARALLEL_DELTAS + DIAGONAL_DELTAS
+KNIGHT_DELTAS = [(-2, -1), (-2, 1), (-1, -2), (-1, 2), (1, -2), (1, 2), (2, -1), (2, 1)]
+
+
+def _encode(start, finish, promotion):
+    '''
+
+    >>> _encode(Coordinate('e2'), Coordinate('e4'), False)
+    1804
+    >>> _encode(Coordinate('a7'), Coordinate('a8'), Queen)
+    7728
+
+    '''
+    code = start.y << 3 | start.x | (finish.y << 3 | finish.x) << 6
+
+    if promotion:
+        code |= PROMOTION_SYMBOLS.index(promotion.symbol) << 12
+
+    return code
+
 
 class Move:
     '''
 
+    Moves are interned: equal moves are the same object, and each one
+    carries a 16-bit ``code`` for compact storage.
+
     >>> move = Move('e2e4')
 
     >>> move
@@ -46,24 +79,66 @@ class Move:
     >>> move.promotion.__name__
     'Knight'
 
+    >>> Move('e2e4') is Move(Coordinate(4, 1), Coordinate(4, 3))
+    True
+
     '''
-    def __init__(self, *args):
+    __slots__ = ('_code', '_start', '_finish', '_promotion', '_uci')
+
+    def __new__(cls, *args):
         if len(args) == 1:
-            self._start = Coordinate(args[0][: 2])
-            self._finish = Coordinate(args[0][2: 4])
+            move = MOVES.get(args[0])
+            if move is not None:
+                return move
 
-            if len(args[0]) > 4:
-                self._promotion = FIGURES[args[0][4]]
-            else:
-                self._promotion = False
+            start = Coordinate(args[0][: 2])
+            finish = Coordinate(args[0][2: 4])
+            promotion = FIGURES[args[0][4]] if len(args[0]) > 4 else False
 
         else:
-            self._start, self._finish = args[: 2]
+            start, finish = args[: 2]
+            promotion = args[2] if len(args) > 2 else False
 
-            if len(args) > 2:
-                self._promotion = args[2]
-            else:
-                self._promotion = False
+        code = _encode(start, finish, promotion)
+        move = MOVES.get(code)
+        if move is None:
+            move = MOVES[code] = super().__new__(cls)
+            move._code = code
+            move._start = SQUARES[code & 63]
+            move._finish = SQUARES[code >> 6 & 63]
+            move._promotion = promotion
+            move._uci = f'{move._start}{move._finish}{promotion.symbol if promotion else ""}'
+
+            MOVES[move._uci] = move
+
+        return move
+
+    @classmethod
+    def from_code(cls, code):
+        '''
+
+        >>> Move.from_code(Move('e2e4').code)
+        Move(Coordinate(4, 1), Coordinate(4, 3), False)
+        >>> Move.from_code(Move('b2a1n').code) is Move('b2a1n')
+        True
+
+        '''
+        return MOVES[code]
+
+    @property
+    def code(self):
+        '''
+
+        Bits 0-5 hold the start square, bits 6-11 the finish square
+        (``8 * y + x``) and bits 12-14 the promotion figure.
+
+        >>> Move('e2e4').code
+        1804
+        >>> Move('a7a8q').code
+        7728
+
+        '''
+        return self._code
 
     @property
     def start(self):
@@ -189,15 +264,16 @@ class Move:
         False
 
         '''
-        return (
-            self._start == other.start and
-            self._finish == other.finish and
-            self._promotion == other.promotion
-        )
+        return self._code == getattr(other, 'code', None)
+
+    def __hash__(self):
+        return self._code
+
+    def __reduce__(self):
+        return type(self), (str(self),)
 
     def __str__(self):
-        promotion = '' if not self._promotion else self._promotion.symbol
-        return f'{self._start}{self._finish}{promotion}'
+        return self._uci
 
     def __repr__(self):
         if self._promotion:
@@ -237,8 +313,11 @@ class Board:
     '''
     def __init__(self, fen_board=None):
         self._cells = [
-            [EmptyCell() for y in range(8)] for x in range(8)
+            [EMPTY] * 8 for x in range(8)
         ]
+        self._key = 0
+        self._pawn_key = 0
+        self._material_key = 0
 
         if fen_board is not None:
             self._load_from_fen(fen_board)
@@ -257,7 +336,7 @@ class Board:
                 color = 'w' if symbol.isupper() else 'b'
                 symbol = symbol.lower()
 
-                self._cells[x][y] = FIGURES[symbol](
+                self[Coordinate(x, y)] = FIGURES[symbol](
                     color=color
                 )
 
@@ -288,10 +367,83 @@ class Board:
 
         return fen_board
 
+    def copy(self):
+        '''
+
+        >>> board = Board('8/8/8/4k3/8/8/8/4K3')
+        >>> board_copy = board.copy()
+        >>> board_copy[Coordinate('e1')] = EmptyCell()
+
+        >>> board_copy
+        Board('8/8/8/4k3/8/8/8/8')
+        >>> board
+        Board('8/8/8/4k3/8/8/8/4K3')
+
+        '''
+        board_copy = type(self)()
+        board_copy._cells = [column[:] for column in self._cells]
+        board_copy._key = self._key
+        board_copy._pawn_key = self._pawn_key
+        board_copy._material_key = self._material_key
+
+        return board_copy
+
     @property
     def cells(self):
         return self._cells
 
+    @property
+    def key(self):
+        '''
+
+        Zobrist key of the figures, updated on every change of a cell.
+
+        >>> board = Board('8/8/8/4k3/8/8/8/4K3')
+        >>> key = board.key
+
+        >>> board[Coordinate('e2')], board[Coordinate('e1')] = board[Coordinate('e1')], EmptyCell()
+        >>> board.key == key, board.key == Board('8/8/8/4k3/8/8/4K3/8').key
+        (False, True)
+
+        '''
+        return self._key
+
+    @property
+    def pawn_key(self):
+        '''
+
+        Zobrist key of the pawns alone, updated with the figure key.
+
+        >>> board = Board('4k3/4p3/8/8/8/8/4P3/4K3')
+        >>> pawn_key = board.pawn_key
+
+        >>> board[Coordinate('e2')], board[Coordinate('e1')] = board[Coordinate('e1')], EmptyCell()
+        >>> board.pawn_key == Board('4k3/4p3/8/8/8/8/8/8').pawn_key
+        True
+        >>> board[Coordinate('e3')] = Pawn('w')
+        >>> board.pawn_key == Board('4k3/4p3/8/8/8/4P3/8/8').pawn_key
+        True
+
+        '''
+        return self._pawn_key
+
+    @property
+    def material_key(self):
+        '''
+
+        Count of every kind of figure, four bits per kind and color, so
+        boards with the same material share the key.
+
+        >>> board = Board('4k3/8/8/8/8/8/8/3NK3')
+        >>> board.material_key == Board('8/3k4/8/8/4N3/8/8/4K3').material_key
+        True
+        >>> board[Coordinate('d1')] = EmptyCell()
+        >>> board.material_key == Board('4k3/8/8/8/8/8/8/4K3').material_key
+        True
+
+        '''
+        return self._material_key
+
     def __getitem__(self, index):
         if isinstance(index, Coordinate):
             return self._cells[index.x][index.y]
@@ -299,7 +451,13 @@ class Board:
             return self._cells[index]
 
     def __setitem__(self, index, value):
-        self._cells[index.x][index.y] = value
+        column, square = self._cells[index.x], index.index
+        old_value = column[index.y]
+
+        self._key ^= PIECE_KEYS[old_value][square] ^ PIECE_KEYS[value][square]
+        self._pawn_key ^= PAWN_KEYS[old_value][square] ^ PAWN_KEYS[value][square]
+        self._material_key += MATERIAL_KEYS[value] - MATERIAL_KEYS[old_value]
+        column[index.y] = value
 
     def __str__(self):
         return self.as_fen
@@ -376,6 +534,10 @@ class Position:
 
         self._number_of_reversible_moves = number_of_reversible_moves
         self._move_number = move_number
+
+        # Keys of the earlier positions, one per played move.
+        self._history = []
+
         for move in moves:
             self.move(move)
 
@@ -485,12 +647,235 @@ class Position:
         False
 
         '''
-        cls = type(self)
+        position_copy = type(self)(
+            self._board.copy(),
+            self._turn,
+            {color: dict(rights) for color, rights in self._castling.items()},
+            self._en_passant,
+            self._number_of_reversible_moves,
+            self._move_number
+        )
 
-        position_copy = cls.from_fen(self.as_fen)
+        if self._number_of_reversible_moves:
+            position_copy._history = self._history[-self._number_of_reversible_moves:]
 
         return position_copy
 
+    @property
+    def key(self):
+        '''
+
+        Zobrist key of the position: figures, turn, castling rights and
+        en passant square.
+
+        >>> position = Position.starting_position()
+        >>> transposition = Position.from_fen(STARTING_POSITION_FEN, ['g1f3', 'g8f6', 'f3g1', 'f6g8'])
+
+        >>> position.key == transposition.key
+        True
+        >>> position.move(Move('e2e4'))
+        >>> position.key == transposition.key
+        False
+
+        '''
+        key = self._board.key
+
+        if self._turn == 'b':
+            key ^= TURN_KEY
+
+        for color, rights in self._castling.items():
+            for side, right in rights.items():
+                if right:
+                    key ^= CASTLING_KEYS[color, side]
+
+        if self._en_passant:
+            key ^= EN_PASSANT_KEYS[self._en_passant.x]
+
+        return key
+
+    def repetitions(self):
+        '''
+
+        Count the earlier occurrences of the position. Only positions
+        since the last capture or pawn move can repeat, so the scan is
+        limited to that window.
+
+        >>> position = Position.starting_position()
+        >>> for move in ['g1f3', 'g8f6', 'f3g1', 'f6g8']:
+        ...     position.move(Move(move))
+        >>> position.repetitions()
+        1
+        >>> position.deepcopy().repetitions()
+        1
+        >>> position.move(Move('e2e4'))
+        >>> position.repetitions()
+        0
+
+        '''
+        history = self._history
+        window = min(self._number_of_reversible_moves, len(history))
+        if window < 4:
+            return 0
+
+        key = self.key
+
+        return sum(
+            1 for index in range(4, window + 1, 2) if history[-index] == key
+        )
+
+    def is_draw(self):
+        '''
+
+        A position is drawn by the fifty-move rule or as soon as it
+        repeats, because a side that can repeat once can repeat again.
+
+        >>> Position.from_fen(('4k3/8/8/8/8/8/8/R3K3', 'w', '-', '-', '100', '80')).is_draw()
+        True
+        >>> position = Position.from_fen(STARTING_POSITION_FEN, ['b1c3', 'b8c6', 'c3b1'])
+        >>> position.is_draw()
+        False
+        >>> position.move(Move('c6b8'))
+        >>> position.is_draw()
+        True
+
+        '''
+        return (
+            self._number_of_reversible_moves >= FIFTY_MOVES_PLIES or
+            self.repetitions() > 0
+        )
+
+    def is_capture(self, move):
+        '''
+
+        >>> position = Position.from_fen(('4k3/8/8/3pP3/8/8/8/4K3', 'w', '-', 'd6', '0', '1'))
+
+        >>> position.is_capture(Move('e5d6')), position.is_capture(Move('e5e6'))
+        (True, False)
+
+        '''
+        figure = self._board[move.start]
+
+        return (
+            not isinstance(self._board[move.finish], EmptyCell) or
+            move.is_en_passant(figure, self._en_passant)
+        )
+
+    def _least_valuable_attacker(self, target, color, removed):
+        '''
+
+        Find the cheapest figure of the color that attacks the target,
+        treating the removed squares as empty.
+
+        >>> position = Position.from_fen(('4k3/8/8/3q4/8/2N5/8/3RK3', 'w', '-', '-', '0', '1'))
+
+        >>> position._least_valuable_attacker(Coordinate('d5'), 'w', set())
+        Coordinate(2, 2)
+        >>> position._least_valuable_attacker(Coordinate('d5'), 'w', {Coordinate('c3')})
+        Coordinate(3, 0)
+
+        '''
+        attackers = []
+
+        pawn_y = target.y - 1 if color == 'w' else target.y + 1
+        for delta_x in (-1, 1):
+            attackers.append((target.x + delta_x, pawn_y, Pawn))
+
+        for delta_x, delta_y in KNIGHT_DELTAS:
+            attackers.append((target.x + delta_x, target.y + delta_y, Knight))
+
+        for delta_x, delta_y in KING_DELTAS:
+            attackers.append((target.x + delta_x, target.y + delta_y, King))
+
+        for deltas, kind in ((DIAGONAL_DELTAS, Bishop), (PARALLEL_DELTAS, Rook)):
+            for delta_x, delta_y in deltas:
+                x, y = target.x + delta_x, target.y + delta_y
+
+                while 0 <= x < 8 and 0 <= y < 8:
+                    coordinate = Coordinate(x, y)
+                    if coordinate not in removed and not isinstance(self._board[coordinate], EmptyCell):
+                        attackers.append((x, y, kind))
+                        break
+
+                    x, y = x + delta_x, y + delta_y
+
+        best, best_worth = None, None
+        for x, y, kind in attackers:
+            if not (0 <= x < 8 and 0 <= y < 8):
+                continue
+
+            coordinate = Coordinate(x, y)
+            figure = self._board[coordinate]
+
+            if (
+                isinstance(figure, kind) and
+                figure.color == color and
+                coordinate not in removed and
+                (best is None or figure.worth < best_worth)
+            ):
+                best, best_worth = coordinate, figure.worth
+
+        return best
+
+    def see(self, move):
+        '''
+
+        Static exchange evaluation: the material the side to move wins
+        by the move when both sides keep recapturing on its finish square
+        with their least valuable figure, each stopping when that pays
+        more. Figures behind a capturer join the exchange once it has
+        moved.
+
+        >>> position = Position.from_fen(('4k3/8/2p5/3p4/4P3/8/8/4K3', 'w', '-', '-', '0', '1'))
+        >>> position.see(Move('e4d5'))
+        Decimal('0')
+
+        >>> position = Position.from_fen(('4k3/2p5/3p4/8/8/8/8/3RK3', 'w', '-', '-', '0', '1'))
+        >>> position.see(Move('d1d6'))
+        Decimal('-4')
+
+        >>> position = Position.from_fen(('3rk3/8/3p4/8/8/8/3R4/3RK3', 'w', '-', '-', '0', '1'))
+        >>> position.see(Move('d2d6'))
+        Decimal('1')
+
+        >>> position = Position.from_fen(('1n2k3/P7/8/8/8/8/8/4K3', 'w', '-', '-', '0', '1'))
+        >>> position.see(Move('a7b8q'))
+        Decimal('11')
+
+        '''
+        start, target = move.start, move.finish
+        figure = self._board[start]
+
+        captured = self._board[target]
+        if isinstance(captured, EmptyCell):
+            gain = Pawn.worth if move.is_en_passant(figure, self._en_passant) else Decimal('0')
+        else:
+            gain = captured.worth
+
+        on_target = figure.worth
+        if move.is_promotion():
+            gain += move.promotion.worth - Pawn.worth
+            on_target = move.promotion.worth
+
+        gains = [gain]
+        removed = {start}
+        color = 'b' if figure.color == 'w' else 'w'
+
+        while True:
+            attacker = self._least_valuable_attacker(target, color, removed)
+            if attacker is None:
+                break
+
+            gains.append(on_target - gains[-1])
+            on_target = self._board[attacker].worth
+            removed.add(attacker)
+            color = 'b' if color == 'w' else 'w'
+
+        while len(gains) > 1:
+            last_gain = gains.pop()
+            gains[-1] = -max(-gains[-1], last_gain)
+
+        return gains[0]
+
     def _update_castling(self, start, finish):
         '''
 
@@ -621,7 +1006,7 @@ class Position:
         self._update_castling(start, finish)
 
         self._board[finish] = self._board[start]
-        self._board[start] = EmptyCell()
+        self._board[start] = EMPTY
 
     def _move_promotion(self, start, finish, promotion):
         '''
@@ -667,7 +1052,7 @@ class Position:
 
         self._update_castling(start, finish)
 
-        self._board[start] = EmptyCell()
+        self._board[start] = EMPTY
         self._board[finish] = promotion(color)
 
     def _move_short_castling(self, start, finish):
@@ -779,9 +1164,9 @@ class Position:
         self._move_simple(start, finish)
 
         if color == 'w':
-            self._board[finish.x][finish.y - 1] = EmptyCell()
+            self._board[finish.delta(y=-1)] = EMPTY
         else:
-            self._board[finish.x][finish.y + 1] = EmptyCell()
+            self._board[finish.delta(y=1)] = EMPTY
 
     def move(self, move):
         '''
@@ -909,7 +1294,13 @@ class Position:
         '''
         self._next_en_passant = False
 
-        if not isinstance(move, EmptyMove):
+        if isinstance(move, EmptyMove):
+            # Repetitions are not detected across a passed turn.
+            self._history = []
+
+        else:
+            self._history.append(self.key)
+
             start, finish = move.start, move.finish
             figure = self._board[start]
             destination = self._board[finish]
@@ -1000,12 +1391,29 @@ class Figure:
     >>> black_figure.fen_symbol
     'f'
 
+    Figures are immutable, so there is one instance per kind and color.
+
+    >>> Figure('b') is black_figure
+    True
+
     '''
     symbol = 'f'
     worth = Decimal('1')
 
-    def __init__(self, color):
-        self._color = color
+    _instances = {}
+
+    __slots__ = ('_color', )
+
+    def __new__(cls, color):
+        figure = cls._instances.get((cls, color))
+        if figure is None:
+            figure = cls._instances[cls, color] = super().__new__(cls)
+            figure._color = color
+
+        return figure
+
+    def __reduce__(self):
+        return type(self), (self._color, )
 
     @property
     def color(self):
@@ -1030,7 +1438,9 @@ class King(Figure):
     symbol = 'k'
     worth = Decimal('300')
 
-    def _simple_moves(self, coordinate, position):
+    __slots__ = ()
+
+    def _simple_moves(self, coordinate, position, moves=None):
         '''
 
         >>> position = Position.from_fen((
@@ -1067,7 +1477,8 @@ class King(Figure):
         ['h4g3', 'h4g4', 'h4h3', 'h4h5']
 
         '''
-        moves = []
+        if moves is None:
+            moves = []
 
         for delta_x in range(-1, 2):
             for delta_y in range(-1, 2):
@@ -1087,7 +1498,7 @@ class King(Figure):
 
         return moves
 
-    def _castling_moves(self, coordinate, position):
+    def _castling_moves(self, coordinate, position, moves=None):
         '''
 
         >>> position = Position.starting_position()
@@ -1120,7 +1531,8 @@ class King(Figure):
         ['e8d7', 'e8d8', 'e8e7', 'e8f7', 'e8f8', 'e8g8']
 
         '''
-        moves = []
+        if moves is None:
+            moves = []
 
         if position.castling[self._color]['k']:
             for delta_x in range(1, 3):
@@ -1144,7 +1556,7 @@ class King(Figure):
 
         return moves
 
-    def available_moves(self, coordinate, position):
+    def available_moves(self, coordinate, position, moves=None):
         '''
 
         >>> position = Position.from_fen((
@@ -1170,16 +1582,18 @@ class King(Figure):
         ['e8d8', 'e8e7', 'e8f7', 'e8f8', 'e8g8', 'e8c8']
 
         '''
-        moves = []
+        if moves is None:
+            moves = []
 
-        moves += self._simple_moves(coordinate, position)
-        moves += self._castling_moves(coordinate, position)
+        self._simple_moves(coordinate, position, moves)
+        self._castling_moves(coordinate, position, moves)
 
         return moves
 
 
-def _delta_moves(self, coordinate, position, deltas):
-    moves = []
+def _delta_moves(self, coordinate, position, deltas, moves=None):
+    if moves is None:
+        moves = []
 
     for delta in deltas:
         current = coordinate
@@ -1211,7 +1625,9 @@ class Rook(Figure):
     symbol = 'r'
     worth = Decimal('5')
 
-    def _parallel_moves(self, coordinate, position):
+    __slots__ = ()
+
+    def _parallel_moves(self, coordinate, position, moves=None):
         '''
 
         >>> position = Position.starting_position()
@@ -1267,19 +1683,20 @@ class Rook(Figure):
 
         '''
         return _delta_moves(
-            self, coordinate, position,
-            [(-1, 0), (1, 0), (0, -1), (0, 1)]
+            self, coordinate, position, PARALLEL_DELTAS, moves
         )
 
-    def available_moves(self, coordinate, position):
-        return self._parallel_moves(coordinate, position)
+    def available_moves(self, coordinate, position, moves=None):
+        return self._parallel_moves(coordinate, position, moves)
 
 
 class Bishop(Figure):
     symbol = 'b'
     worth = Decimal('3')
 
-    def _diagonal_moves(self, coordinate, position):
+    __slots__ = ()
+
+    def _diagonal_moves(self, coordinate, position, moves=None):
         '''
 
         >>> position = Position.starting_position()
@@ -1324,19 +1741,20 @@ class Bishop(Figure):
 
         '''
         return _delta_moves(
-            self, coordinate, position,
-            [(-1, -1), (-1, 1), (1, -1), (1, 1)]
+            self, coordinate, position, DIAGONAL_DELTAS, moves
         )
 
-    def available_moves(self, coordinate, position):
-        return self._diagonal_moves(coordinate, position)
+    def available_moves(self, coordinate, position, moves=None):
+        return self._diagonal_moves(coordinate, position, moves)
 
 
 class Queen(Rook, Bishop):
     symbol = 'q'
     worth = Decimal('9')
 
-    def available_moves(self, coordinate, position):
+    __slots__ = ()
+
+    def available_moves(self, coordinate, position, moves=None):
         '''
 
         >>> position = Position.starting_position()
@@ -1373,10 +1791,11 @@ class Queen(Rook, Bishop):
          'e6d5', 'e6c4', 'e6b3', 'e6a2', 'e6d7', 'e6f7']
 
         '''
-        moves = []
+        if moves is None:
+            moves = []
 
-        moves += self._parallel_moves(coordinate, position)
-        moves += self._diagonal_moves(coordinate, position)
+        self._parallel_moves(coordinate, position, moves)
+        self._diagonal_moves(coordinate, position, moves)
 
         return moves
 
@@ -1385,7 +1804,9 @@ class Knight(Figure):
     symbol = 'n'
     worth = Decimal('3')
 
-    def available_moves(self, coordinate, position):
+    __slots__ = ()
+
+    def available_moves(self, coordinate, position, moves=None):
         '''
 
         >>> position = Position.starting_position()
@@ -1429,7 +1850,8 @@ class Knight(Figure):
         ['c6a5', 'c6b4', 'c6b8', 'c6d4', 'c6d8', 'c6e7']
 
         '''
-        moves = []
+        if moves is None:
+            moves = []
 
         for delta_x in [-2, -1, 1, 2]:
             for delta_y in [-2, -1, 1, 2]:
@@ -1454,9 +1876,11 @@ class Pawn(Figure):
     symbol = 'p'
     worth = Decimal('1')
 
+    __slots__ = ()
+
     promotion_figures = [Queen, Rook, Bishop, Knight]
 
-    def _simple_moves(self, coordinate, position):
+    def _simple_moves(self, coordinate, position, moves=None):
         '''
 
         >>> position = Position.starting_position()
@@ -1513,7 +1937,8 @@ class Pawn(Figure):
          'g7f8b', 'g7f8n', 'g7h8q', 'g7h8r', 'g7h8b', 'g7h8n']
 
         '''
-        moves = []
+        if moves is None:
+            moves = []
 
         factor_y = 1 if self._color == 'w' else -1
         promotion_y = 6 if self._color == 'w' else 1
@@ -1537,7 +1962,7 @@ class Pawn(Figure):
 
         return moves
 
-    def _take_moves(self, coordinate, position):
+    def _take_moves(self, coordinate, position, moves=None):
         '''
 
         >>> position = Position.from_fen((
@@ -1600,7 +2025,8 @@ class Pawn(Figure):
         ['c4d3']
 
         '''
-        moves = []
+        if moves is None:
+            moves = []
 
         factor_y = 1 if self._color == 'w' else -1
         promotion_y = 6 if self._color == 'w' else 1
@@ -1628,11 +2054,12 @@ class Pawn(Figure):
 
         return moves
 
-    def available_moves(self, coordinate, position):
-        moves = []
+    def available_moves(self, coordinate, position, moves=None):
+        if moves is None:
+            moves = []
 
-        moves += self._simple_moves(coordinate, position)
-        moves += self._take_moves(coordinate, position)
+        self._simple_moves(coordinate, position, moves)
+        self._take_moves(coordinate, position, moves)
 
         return moves
 
@@ -1649,5 +2076,61 @@ FIGURES = {
 }
 
 
+def _fill_keys():
+    random = Random(0x5EED)
+
+    piece_keys = {EMPTY: [0] * 64}
+    for figure_class in FIGURES.values():
+        for color in 'wb':
+            piece_keys[figure_class(color)] = [random.getrandbits(64) for _ in range(64)]
+
+    castling_keys = {
+        (color, side): random.getrandbits(64) for color in 'wb' for side in 'kq'
+    }
+    en_passant_keys = [random.getrandbits(64) for _ in range(8)]
+
+    return piece_keys, random.getrandbits(64), castling_keys, en_passant_keys
+
+
+PIECE_KEYS, TURN_KEY, CASTLING_KEYS, EN_PASSANT_KEYS = _fill_keys()
+
+PAWN_KEYS = {
+    figure: keys if isinstance(figure, Pawn) else [0] * 64 for figure, keys in PIECE_KEYS.items()
+}
+
+MATERIAL_KEYS = {
+    figure: 0 if figure is EMPTY else 1 << 4 * index for index, figure in enumerate(PIECE_KEYS)
+}
+
+
+def _fill_moves():
+    '''
+
+    Intern every move a figure can geometrically make, so that parsing
+    and printing the usual moves is a table lookup.
+
+    >>> MOVES['g1f3'] is MOVES[Move('g1f3').code]
+    True
+    >>> MOVES['b7c8r']
+    Move(Coordinate(1, 6), Coordinate(2, 7), Rook)
+
+    '''
+    for start in SQUARES:
+        for finish in SQUARES:
+            dx, dy = abs(finish.x - start.x), abs(finish.y - start.y)
+            if (dx, dy) == (0, 0):
+                continue
+
+            if dx == 0 or dy == 0 or dx == dy or {dx, dy} == {1, 2}:
+                Move(start, finish)
+
+            if dx <= 1 and (start.y, finish.y) in ((6, 7), (1, 0)):
+                for symbol in PROMOTION_SYMBOLS[1:]:
+                    Move(start, finish, FIGURES[symbol])
+
+
+_fill_moves()
+
+
 if __name__ == '__main__':
     doctest.testmod()
@@ -27,18 +27,28 @@ class Coordinate:
     >>> coordinate.y
     7
 
+    There is a single instance per square.
+
+    >>> Coordinate('h8') is coordinate
+    True
+
     '''
-    def __init__(self, *args):
+    __slots__ = ('_x', '_y')
+
+    def __new__(cls, *args):
         if len(args) == 1:
-            self._x = ascii_lowercase.index(args[0][0])
-            self._y = int(args[0][1]) - 1
+            x = ascii_lowercase.index(args[0][0])
+            y = int(args[0][1]) - 1
 
         else:
-            self._x, self._y = args
+            x, y = args
 
-        self._normalize()
+        x, y = cls._normalize(x, y)
 
-    def _normalize(self):
+        return SQUARES[y << 3 | x]
+
+    @staticmethod
+    def _normalize(x, y):
         '''
 
         >>> Coordinate(-1, 4)
@@ -48,11 +58,15 @@ class Coordinate:
         Coordinate(2, 7)
 
         '''
-        self._x = min(7, self._x)
-        self._x = max(0, self._x)
+        return max(0, min(7, x)), max(0, min(7, y))
+
+    @classmethod
+    def _create(cls, x, y):
+        coordinate = super().__new__(cls)
+        coordinate._x = x
+        coordinate._y = y
 
-        self._y = min(7, self._y)
-        self._y = max(0, self._y)
+        return coordinate
 
     @property
     def x(self):
@@ -62,6 +76,16 @@ class Coordinate:
     def y(self):
         return self._y
 
+    @property
+    def index(self):
+        '''
+
+        >>> Coordinate('e2').index
+        12
+
+        '''
+        return self._y << 3 | self._x
+
     def delta(self, x=0, y=0):
         '''
 
@@ -96,7 +120,16 @@ class Coordinate:
         True
 
         '''
-        return self._x == other.x and self._y == other.y
+        return self is other or (
+            isinstance(other, Coordinate) and
+            self._x == other.x and self._y == other.y
+        )
+
+    def __hash__(self):
+        return self._y << 3 | self._x
+
+    def __reduce__(self):
+        return type(self), (self._x, self._y)
 
     def __str__(self):
         return f'{ascii_lowercase[self._x]}{self._y + 1}'
@@ -114,8 +147,18 @@ class EmptyCell:
     EmptyCell()
     >>> str(empty_cell)
     'Empty Cell'
+    >>> empty_cell is EMPTY
+    True
 
     '''
+    __slots__ = ()
+
+    def __new__(cls):
+        return EMPTY
+
+    def __reduce__(self):
+        return type(self), ()
+
     def __str__(self):
         return 'Empty Cell'
 
@@ -132,8 +175,18 @@ class EmptyMove:
     EmptyMove()
     >>> str(empty_move)
     '0000'
+    >>> empty_move is EmptyMove()
+    True
 
     '''
+    __slots__ = ()
+
+    def __new__(cls):
+        return NULL_MOVE
+
+    def __reduce__(self):
+        return type(self), ()
+
     def __str__(self):
         return '0000'
 
@@ -141,5 +194,11 @@ class EmptyMove:
         return f'{type(self).__name__}()'
 
 
+SQUARES = [Coordinate._create(index & 7, index >> 3) for index in range(64)]
+
+EMPTY = object.__new__(EmptyCell)
+NULL_MOVE = object.__new__(EmptyMove)
+
+
 if __name__ == '__main__':
     doctest.testmod()
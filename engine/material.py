@@ -0,0 +1,196 @@
+import doctest
+from decimal import Decimal
+from itertools import product
+
+try:
+    from .core.position import MATERIAL_KEYS, Bishop, Board, King, Knight, Queen, Rook
+except (SystemError, ImportError):
+    from core.position import MATERIAL_KEYS, Bishop, Board, King, Knight, Queen, Rook
+
+EDGE_BONUS = Decimal('0.1') # per step of the lone king away from the center
+KINGS_PROXIMITY_BONUS = Decimal('0.05') # per step the kings are closer than 7 squares
+
+
+def drive_to_edge(board, color):
+    '''
+
+    Grade for the side of color against a lone king: the nearer the
+    lone king is to a corner and the closer the kings are, the better.
+
+    >>> drive_to_edge(Board('7k/8/5K2/8/8/8/8/R7'), 'w')
+    Decimal('0.85')
+    >>> drive_to_edge(Board('8/8/8/3k4/8/8/8/R3K3'), 'w')
+    Decimal('0.15')
+
+    '''
+    kings = {}
+    for x in range(8):
+        for y in range(8):
+            cell = board[x][y]
+            if isinstance(cell, King):
+                kings[cell.color] = x, y
+
+    (x, y), (other_x, other_y) = kings['b' if color == 'w' else 'w'], kings[color]
+    edge = max(3 - x, x - 4) + max(3 - y, y - 4)
+    distance = max(abs(x - other_x), abs(y - other_y))
+
+    return edge * EDGE_BONUS + (7 - distance) * KINGS_PROXIMITY_BONUS
+
+
+class MaterialEntry:
+    '''
+
+    What the material alone says about a position: whether it is a dead
+    draw, how much of the static grade to trust, and which specialized
+    evaluation to add for the stronger side.
+
+    >>> MaterialEntry()
+    MaterialEntry(draw=False, scale=Decimal('1'), endgame=None, color=None)
+    >>> str(MaterialEntry(endgame=drive_to_edge, color='w'))
+    'drive_to_edge for white'
+
+    '''
+    __slots__ = ('_draw', '_scale', '_endgame', '_color')
+
+    def __init__(self, draw=False, scale=Decimal('1'), endgame=None, color=None):
+        self._draw = draw
+        self._scale = scale
+        self._endgame = endgame
+        self._color = color
+
+    @property
+    def draw(self):
+        return self._draw
+
+    @property
+    def scale(self):
+        return self._scale
+
+    def endgame_grade(self, board):
+        '''
+
+        The specialized evaluation from white's side.
+
+        >>> MaterialEntry(endgame=drive_to_edge, color='b').endgame_grade(Board('r7/8/8/8/8/5k2/8/7K'))
+        Decimal('-0.85')
+        >>> MaterialEntry().endgame_grade(Board('r7/8/8/8/8/5k2/8/7K'))
+        Decimal('0')
+
+        '''
+        if self._endgame is None:
+            return Decimal('0')
+
+        grade = self._endgame(board, self._color)
+
+        return grade if self._color == 'w' else -grade
+
+    def __str__(self):
+        if self._draw:
+            return 'draw'
+
+        if self._endgame is not None:
+            return f'{self._endgame.__name__} for {"white" if self._color == "w" else "black"}'
+
+        return f'scale {self._scale}'
+
+    def __repr__(self):
+        return (
+            f'{type(self).__name__}(draw={self._draw!r}, scale={self._scale!r}, '
+            f'endgame={None if self._endgame is None else self._endgame.__name__}, color={self._color!r})'
+        )
+
+
+DEFAULT_ENTRY = MaterialEntry()
+
+
+def _material_entry(counts):
+    worths = {
+        color: sum(
+            figure_class.worth * number for figure_class, number in counts[color].items() if figure_class is not King
+        )
+        for color in 'wb'
+    }
+
+    minors = sum(counts[color][Bishop] + counts[color][Knight] for color in 'wb')
+    majors = sum(counts[color][Queen] + counts[color][Rook] for color in 'wb')
+    if not majors and minors <= 1:
+        return MaterialEntry(draw=True, scale=Decimal('0'))
+
+    if worths['w'] == worths['b']:
+        return None
+
+    strong, weak = ('w', 'b') if worths['w'] > worths['b'] else ('b', 'w')
+
+    if not worths[weak]:
+        if worths[strong] == counts[strong][Knight] * Knight.worth:
+            return MaterialEntry(scale=Decimal('0'))
+
+        return MaterialEntry(endgame=drive_to_edge, color=strong)
+
+    if worths[strong] - worths[weak] <= Bishop.worth:
+        if worths[strong] < Rook.worth:
+            return MaterialEntry(scale=Decimal('0'))
+
+        return MaterialEntry(scale=Decimal('0.0625') if worths[weak] <= Bishop.worth else Decimal('0.25'))
+
+    return None
+
+
+def _fill_material_table():
+    '''
+
+    Entries for every pawnless ending with at most a queen, two rooks,
+    two bishops and two knights a side; everything else uses
+    DEFAULT_ENTRY.
+
+    >>> str(MATERIAL_TABLE[Board('4k3/8/8/8/8/8/8/4K3').material_key])
+    'draw'
+    >>> str(MATERIAL_TABLE[Board('4k3/8/8/8/8/8/8/2B1K3').material_key])
+    'draw'
+    >>> str(MATERIAL_TABLE[Board('4k3/8/8/8/8/8/8/1N2KN2').material_key])
+    'scale 0'
+    >>> str(MATERIAL_TABLE[Board('4k3/8/8/8/8/8/8/R3K3').material_key])
+    'drive_to_edge for white'
+    >>> str(MATERIAL_TABLE[Board('4k3/4b3/8/8/8/8/8/R3K3').material_key])
+    'scale 0.0625'
+    >>> Board('4k3/4r3/8/8/8/8/8/R3K3').material_key in MATERIAL_TABLE
+    False
+
+    '''
+    table = {}
+
+    sides = [
+        {King: 1, Queen: queens, Rook: rooks, Bishop: bishops, Knight: knights}
+        for queens, rooks, bishops, knights in product(range(2), range(3), range(3), range(3))
+    ]
+    for white, black in product(sides, repeat=2):
+        counts = {'w': white, 'b': black}
+        entry = _material_entry(counts)
+
+        if entry is not None:
+            key = sum(
+                MATERIAL_KEYS[figure_class(color)] * number
+                for color in 'wb' for figure_class, number in counts[color].items()
+            )
+            table[key] = entry
+
+    return table
+
+
+MATERIAL_TABLE = _fill_material_table()
+
+
+def probe_material(board):
+    '''
+
+    >>> probe_material(Board('rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP/RNBQKBNR')) is DEFAULT_ENTRY
+    True
+    >>> probe_material(Board('8/8/3k4/8/8/2N5/8/4K3')).draw
+    True
+
+    '''
+    return MATERIAL_TABLE.get(board.material_key, DEFAULT_ENTRY)
+
+
+if __name__ == '__main__':
+    doctest.testmod()
@@ -0,0 +1,138 @@
+import doctest
+from collections import Counter
+from decimal import Decimal
+
+try:
+    from .core.position import Board, Pawn
+except (SystemError, ImportError):
+    from core.position import Board, Pawn
+
+PAWN_TABLE_SIZE = 2 ** 14 # entries, a power of two
+
+DOUBLED_PAWN = Decimal('-0.2')
+ISOLATED_PAWN = Decimal('-0.15')
+BACKWARD_PAWN = Decimal('-0.1')
+PASSED_PAWN = [Decimal(bonus) for bonus in ('0', '0.1', '0.1', '0.2', '0.35', '0.6', '1', '0')]
+
+
+def evaluate_pawns(board):
+    '''
+
+    Grade the pawn structure from white's side and find the passed
+    pawns of both colors, as masks with bit ``8 * y + x`` set for each.
+
+    >>> evaluate_pawns(Board('4k3/ppp5/8/8/8/8/PPP5/4K3'))
+    (Decimal('0'), {'w': 0, 'b': 0})
+
+    White has doubled isolated pawns on the a-file, a backward pawn on
+    e3 and a passed pawn on d5, black has two isolated pawns:
+
+    >>> evaluate_pawns(Board('4k3/1p6/8/3P1p2/8/P3P3/P7/4K3'))
+    (Decimal('-0.15'), {'w': 34359738368, 'b': 0})
+    >>> 1 << (8 * 4 + 3)
+    34359738368
+
+    '''
+    pawns = {'w': [], 'b': []}
+    for x in range(8):
+        for y in range(8):
+            cell = board[x][y]
+            if isinstance(cell, Pawn):
+                pawns[cell.color].append((x, y))
+
+    grade = Decimal('0')
+    passed = {'w': 0, 'b': 0}
+
+    for color, enemy_color, forward in (('w', 'b', 1), ('b', 'w', -1)):
+        own, enemy = pawns[color], pawns[enemy_color]
+        files = Counter(x for x, y in own)
+        pawn_grade = Decimal('0')
+
+        for x, y in own:
+            if files[x] > 1:
+                pawn_grade += DOUBLED_PAWN
+
+            if not files[x - 1] and not files[x + 1]:
+                pawn_grade += ISOLATED_PAWN
+
+            elif (
+                not any(abs(x - other_x) == 1 and (y - other_y) * forward >= 0 for other_x, other_y in own) and
+                any(abs(x - enemy_x) == 1 and enemy_y == y + 2 * forward for enemy_x, enemy_y in enemy)
+            ):
+                pawn_grade += BACKWARD_PAWN
+
+            if not any(abs(x - enemy_x) <= 1 and (enemy_y - y) * forward > 0 for enemy_x, enemy_y in enemy):
+                pawn_grade += PASSED_PAWN[y if color == 'w' else 7 - y]
+                passed[color] |= 1 << (8 * y + x)
+
+        grade += pawn_grade if color == 'w' else -pawn_grade
+
+    return grade, passed
+
+
+class PawnTable:
+    '''
+
+    Direct-mapped cache of evaluate_pawns, indexed by the low bits of
+    the board's pawn key. The entries are allocated on first use.
+
+    >>> pawn_table = PawnTable(size=4)
+
+    >>> pawn_table
+    PawnTable(size=4)
+    >>> str(pawn_table)
+    'PawnTable with 0 of 4 entries used'
+    >>> pawn_table.probe(Board('4k3/1p6/8/3P1p2/8/P3P3/P7/4K3'))
+    (Decimal('-0.15'), {'w': 34359738368, 'b': 0})
+    >>> pawn_table.probe(Board('4k3/1p6/8/3P1p2/8/P3P3/P7/3K4'))
+    (Decimal('-0.15'), {'w': 34359738368, 'b': 0})
+    >>> pawn_table.hits, pawn_table.probes
+    (1, 2)
+    >>> str(pawn_table)
+    'PawnTable with 1 of 4 entries used'
+
+    '''
+    def __init__(self, size=PAWN_TABLE_SIZE):
+        self._size = size
+        self._entries = None
+        self._mask = size - 1
+
+        self._hits = 0
+        self._probes = 0
+
+    def probe(self, board):
+        if self._entries is None:
+            self._entries = [None] * self._size
+
+        key = board.pawn_key
+        index = key & self._mask
+        entry = self._entries[index]
+
+        self._probes += 1
+        if entry is not None and entry[0] == key:
+            self._hits += 1
+            return entry[1]
+
+        result = evaluate_pawns(board)
+        self._entries[index] = (key, result)
+
+        return result
+
+    @property
+    def hits(self):
+        return self._hits
+
+    @property
+    def probes(self):
+        return self._probes
+
+    def __str__(self):
+        used = sum(1 for entry in self._entries or () if entry is not None)
+        return f'{type(self).__name__} with {used} of {self._size} entries used'
+
+    def __repr__(self):
+        return f'{type(self).__name__}(size={self._size})'
+
+
+if __name__ == '__main__':
+    doctest.testmod()
@@ -0,0 +1,101 @@
+import doctest
+import sys
+from collections import Counter
+from threading import Event, Thread
+from time import sleep
+
+PROFILE_HZ = 1000
+
+
+def _frame_name(frame):
+    code = frame.f_code
+    module = frame.f_globals.get('__name__', '?')
+
+    return f'{module}.{getattr(code, "co_qualname", code.co_name)}'
+
+
+class SamplingProfiler:
+    '''
+
+    >>> import os, tempfile
+    >>> from threading import get_ident
+
+    >>> def spin(seconds):
+    ...     profiler = SamplingProfiler(get_ident(), 500)
+    ...     profiler.start()
+    ...     sleep(seconds)
+    ...     profiler.stop()
+    ...     return profiler
+
+    >>> profiler = spin(0.1)
+    >>> profiler # doctest: +ELLIPSIS
+    SamplingProfiler(..., 500)
+    >>> profiler.samples > 0
+    True
+
+    >>> with tempfile.TemporaryDirectory() as directory:
+    ...     path = os.path.join(directory, 'search.stacks')
+    ...     profiler.dump(path)
+    ...     with open(path) as stacks_file:
+    ...         stack, count = stacks_file.readline().rsplit(' ', 1)
+    >>> stack.endswith('spin')
+    True
+    >>> int(count) > 0
+    True
+
+    '''
+    def __init__(self, thread_id, hz=PROFILE_HZ):
+        self._thread_id = thread_id
+        self._hz = hz
+
+        self._stacks = Counter()
+        self._stopped = Event()
+        self._sampler = Thread(target=self._sample, daemon=True)
+
+        self._switch_interval = None
+
+    def _sample(self):
+        interval = 1 / self._hz
+
+        while not self._stopped.wait(interval):
+            frame = sys._current_frames().get(self._thread_id)
+            if frame is None:
+                continue
+
+            stack = []
+            while frame is not None:
+                stack.append(_frame_name(frame))
+                frame = frame.f_back
+
+            self._stacks[';'.join(reversed(stack))] += 1
+
+    def start(self):
+        self._switch_interval = sys.getswitchinterval()
+        sys.setswitchinterval(min(self._switch_interval, 1 / self._hz))
+
+        self._sampler.start()
+
+    def stop(self):
+        self._stopped.set()
+        self._sampler.join()
+
+        sys.setswitchinterval(self._switch_interval)
+
+    def dump(self, path):
+        with open(path, 'a') as stacks_file:
+            for stack, count in self._stacks.items():
+                stacks_file.write(f'{stack} {count}\n')
+
+    @property
+    def samples(self):
+        return sum(self._stacks.values())
+
+    def __str__(self):
+        return f'{type(self).__name__} at {self._hz} Hz'
+
+    def __repr__(self):
+        return f'{type(self).__name__}({self._thread_id!r}, {self._hz!r})'
+
+
+if __name__ == '__main__':
+    doctest.testmod()
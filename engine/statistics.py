@@ -0,0 +1,140 @@
+import doctest
+from collections import Counter
+from time import perf_counter
+
+
+class SearchStatistics:
+    '''
+
+    >>> statistics = SearchStatistics()
+
+    >>> statistics
+    SearchStatistics()
+    >>> statistics.count('nodes', 20)
+    >>> statistics.count('legality_rejections')
+    >>> statistics.counters
+    Counter({'nodes': 20, 'legality_rejections': 1})
+
+    >>> double = statistics.timed('double', lambda value: value * 2)
+    >>> double(21)
+    42
+    >>> statistics.calls
+    Counter({'double': 1})
+    >>> statistics.timers['double'] >= 0
+    True
+
+    >>> for line in statistics.as_info(): print(line) # doctest: +ELLIPSIS
+    info string nodes 20
+    info string legality_rejections 1
+    info string time double ... s in 1 calls
+
+    '''
+    def __init__(self):
+        self._counters = Counter()
+        self._timers = Counter()
+        self._calls = Counter()
+
+    def count(self, name, amount=1):
+        self._counters[name] += amount
+
+    def timed(self, name, function):
+        timers, calls = self._timers, self._calls
+
+        def timed_function(*args, **kwargs):
+            start_time = perf_counter()
+            try:
+                return function(*args, **kwargs)
+            finally:
+                timers[name] += perf_counter() - start_time
+                calls[name] += 1
+
+        return timed_function
+
+    def timed_generator(self, name, function):
+        '''
+
+        Time a generator function by the steps it runs, so a caller
+        that stops early is only charged for what was generated.
+
+        >>> statistics = SearchStatistics()
+
+        >>> squares = statistics.timed_generator('squares', lambda count: (value ** 2 for value in range(count)))
+        >>> list(squares(4))
+        [0, 1, 4, 9]
+        >>> next(squares(4))
+        0
+        >>> statistics.calls
+        Counter({'squares': 2})
+
+        '''
+        timers, calls = self._timers, self._calls
+
+        def timed_function(*args, **kwargs):
+            calls[name] += 1
+            generator = function(*args, **kwargs)
+
+            while True:
+                start_time = perf_counter()
+                try:
+                    item = next(generator)
+                except StopIteration:
+                    return
+                finally:
+                    timers[name] += perf_counter() - start_time
+
+                yield item
+
+        return timed_function
+
+    def ratio(self, numerator, denominator):
+        '''
+
+        >>> statistics = SearchStatistics()
+
+        >>> statistics.ratio('hits', 'probes')
+        0.0
+        >>> statistics.count('hits', 3); statistics.count('probes', 4)
+        >>> statistics.ratio('hits', 'probes')
+        0.75
+
+        '''
+        if not self._counters[denominator]:
+            return 0.0
+
+        return self._counters[numerator] / self._counters[denominator]
+
+    def as_info(self):
+        lines = []
+
+        for name, value in self._counters.items():
+            if isinstance(value, float):
+                lines.append(f'info string {name} {value:.2f}')
+            else:
+                lines.append(f'info string {name} {value}')
+
+        for name, seconds in self._timers.items():
+            lines.append(f'info string time {name} {seconds:.3f} s in {self._calls[name]} calls')
+
+        return lines
+
+    @property
+    def counters(self):
+        return self._counters
+
+    @property
+    def timers(self):
+        return self._timers
+
+    @property
+    def calls(self):
+        return self._calls
+
+    def __str__(self):
+        return f'{type(self).__name__} of {sum(self._counters.values())} events'
+
+    def __repr__(self):
+        return f'{type(self).__name__}()'
+
+
+if __name__ == '__main__':
+    doctest.testmod()
@@ -0,0 +1,152 @@
+import doctest
+import json
+import os
+from bisect import bisect_left
+from threading import Lock
+from time import time
+
+NPS_BUCKETS = [10, 30, 100, 300, 1000, 3000, 10000, 30000, 100000]
+
+
+class TelemetrySink:
+    '''
+
+    >>> import tempfile
+
+    >>> directory = tempfile.TemporaryDirectory()
+    >>> path = os.path.join(directory.name, 'searches.jsonl')
+    >>> metrics_path = os.path.join(directory.name, 'engine.prom')
+
+    >>> telemetry = TelemetrySink(path, metrics_path)
+    >>> telemetry # doctest: +ELLIPSIS
+    TelemetrySink('.../searches.jsonl', '.../engine.prom')
+
+    >>> telemetry.record({'nodes': 200, 'nps': 50, 'time_used': 4.0, 'time_allocated': 5.0})
+    >>> telemetry.record({'nodes': 300, 'nps': 500, 'time_used': 0.6, 'time_allocated': 0.5})
+    >>> telemetry.record({'nodes': 10, 'nps': 20, 'time_used': 0.5, 'time_allocated': None})
+
+    >>> with open(path) as records_file:
+    ...     [json.loads(line)['nodes'] for line in records_file]
+    [200, 300, 10]
+
+    >>> with open(metrics_path) as metrics_file:
+    ...     print(metrics_file.read()) # doctest: +ELLIPSIS
+    # HELP engine_searches_total Completed searches.
+    # TYPE engine_searches_total counter
+    engine_searches_total 3
+    # HELP engine_nodes_total Nodes searched.
+    # TYPE engine_nodes_total counter
+    engine_nodes_total 510
+    # HELP engine_time_overruns_total Searches that used more than their allocated time.
+    # TYPE engine_time_overruns_total counter
+    engine_time_overruns_total 1
+    # HELP engine_search_seconds_total Time spent searching.
+    # TYPE engine_search_seconds_total counter
+    engine_search_seconds_total 5.1
+    # HELP engine_nps Nodes per second of completed searches.
+    # TYPE engine_nps histogram
+    engine_nps_bucket{le="10"} 0
+    engine_nps_bucket{le="30"} 1
+    engine_nps_bucket{le="100"} 2
+    engine_nps_bucket{le="300"} 2
+    engine_nps_bucket{le="1000"} 3
+    ...
+    engine_nps_bucket{le="+Inf"} 3
+    engine_nps_sum 570
+    engine_nps_count 3
+    <BLANKLINE>
+
+    A pondering search is only held to its time from ponderhit on.
+
+    >>> telemetry.record({'nodes': 50, 'nps': 40, 'time_used': 1.2, 'time_allocated': 0.2, 'time_used_on_clock': 0.19})
+    >>> with open(metrics_path) as metrics_file:
+    ...     [line.strip() for line in metrics_file if line.startswith('engine_time_overruns_total')]
+    ['engine_time_overruns_total 1']
+
+    >>> directory.cleanup()
+
+    '''
+    def __init__(self, path, metrics_path=None):
+        self._path = path
+        self._metrics_path = metrics_path
+
+        self._lock = Lock()
+
+        self._searches = 0
+        self._nodes = 0
+        self._overruns = 0
+        self._seconds = 0.0
+        self._nps_buckets = [0] * (len(NPS_BUCKETS) + 1)
+        self._nps_sum = 0
+
+    def record(self, report):
+        with self._lock:
+            with open(self._path, 'a') as records_file:
+                records_file.write(json.dumps(dict(report, timestamp=time())) + '\n')
+
+            self._searches += 1
+            self._nodes += report['nodes']
+            self._seconds += report['time_used']
+
+            time_used_on_clock = report.get('time_used_on_clock')
+            if time_used_on_clock is None:
+                time_used_on_clock = report['time_used']
+
+            if report['time_allocated'] is not None and time_used_on_clock > report['time_allocated']:
+                self._overruns += 1
+
+            self._nps_buckets[bisect_left(NPS_BUCKETS, report['nps'])] += 1
+            self._nps_sum += report['nps']
+
+            if self._metrics_path is not None:
+                self._write_metrics()
+
+    def _write_metrics(self):
+        lines = []
+
+        for name, kind, description, value in [
+            ('engine_searches_total', 'counter', 'Completed searches.', self._searches),
+            ('engine_nodes_total', 'counter', 'Nodes searched.', self._nodes),
+            (
+                'engine_time_overruns_total', 'counter',
+                'Searches that used more than their allocated time.', self._overruns
+            ),
+            ('engine_search_seconds_total', 'counter', 'Time spent searching.', round(self._seconds, 6)),
+        ]:
+            lines.append(f'# HELP {name} {description}')
+            lines.append(f'# TYPE {name} {kind}')
+            lines.append(f'{name} {value}')
+
+        lines.append('# HELP engine_nps Nodes per second of completed searches.')
+        lines.append('# TYPE engine_nps histogram')
+
+        cumulative = 0
+        for bound, count in zip(NPS_BUCKETS + ['+Inf'], self._nps_buckets):
+            cumulative += count
+            lines.append(f'engine_nps_bucket{{le="{bound}"}} {cumulative}')
+
+        lines.append(f'engine_nps_sum {self._nps_sum}')
+        lines.append(f'engine_nps_count {self._searches}')
+
+        temporary_path = f'{self._metrics_path}.tmp'
+        with open(temporary_path, 'w') as metrics_file:
+            metrics_file.write('\n'.join(lines) + '\n')
+        os.replace(temporary_path, self._metrics_path)
+
+    @property
+    def path(self):
+        return self._path
+
+    @property
+    def metrics_path(self):
+        return self._metrics_path
+
+    def __str__(self):
+        return f'{type(self).__name__} to {self._path}'
+
+    def __repr__(self):
+        return f'{type(self).__name__}({self._path!r}, {self._metrics_path!r})'
+
+
+if __name__ == '__main__':
+    doctest.testmod()
@@ -0,0 +1,619 @@
+import asyncio
+import doctest
+import os
+import sys
+from collections import deque
+from functools import partial
+from multiprocessing import get_context
+from queue import Queue
+from threading import Condition, Lock, Thread
+
+try:
+    from .analyzer import Analyzer, EmptyMove
+except (SystemError, ImportError):
+    from analyzer import Analyzer, EmptyMove
+
+SWITCH_INTERVAL = 0.0005 # seconds the search may hold the GIL in a child process
+MAX_PENDING_JOBS = 2 # running, queued and superseded searches per session before its commands stop being read
+
+
+class SearchWorker:
+    '''
+
+    >>> from engine.analyzer import Position
+
+    >>> worker = SearchWorker()
+    >>> worker
+    SearchWorker()
+    >>> str(worker)
+    'SearchWorker idle'
+    >>> worker.state
+    'idle'
+
+    >>> position = Position.from_fen(('6k1/5ppp/8/8/8/8/8/R5K1', 'w', '-', '-', '0', '1'))
+    >>> analyzer = Analyzer(position)
+
+    >>> worker.submit(analyzer, on_finish=lambda move, ponder_move: print(f'first {move}'))
+    >>> worker.state
+    'searching'
+    >>> worker.submit(analyzer, mate=1, on_finish=lambda move, ponder_move: print(f'second {move}'))
+    >>> worker.join() # doctest: +ELLIPSIS
+    first ...
+    second a1a8
+    >>> worker.state
+    'idle'
+
+    >>> worker.submit(analyzer, plies='x', on_finish=lambda move, ponder_move: print(f'failed {move}'),
+    ...               on_info=print)
+    >>> worker.join() # doctest: +ELLIPSIS
+    failed ...
+    info string search failed: TypeError(...)
+    >>> worker.state
+    'idle'
+
+    >>> worker.shutdown()
+    >>> worker.state
+    'stopped'
+
+    '''
+    def __init__(self):
+        self._jobs = Queue()
+        self._lock = Lock()
+
+        self._current = None
+        self._latest = None
+        self._stopped = False
+
+        self._thread = Thread(target=self._work, daemon=True)
+        self._thread.start()
+
+    def _work(self):
+        while True:
+            job = self._jobs.get()
+
+            if job is None:
+                self._jobs.task_done()
+                break
+
+            analyzer, limits = job
+            prepared = False
+
+            try:
+                with self._lock:
+                    if job is not self._latest:
+                        limits = dict(limits, plies=0)
+
+                    analyzer.prepare(**limits)
+                    self._current = analyzer
+
+                prepared = True
+                analyzer.run()
+
+            except Exception as error:
+                self._fail(limits, error, prepared)
+
+            finally:
+                with self._lock:
+                    self._current = None
+
+                self._jobs.task_done()
+
+    def _fail(self, limits, error, prepared):
+        on_info = limits.get('on_info')
+        if on_info is not None:
+            on_info(f'info string search failed: {error!r}')
+
+        on_finish = limits.get('on_finish')
+        if not prepared and on_finish is not None:
+            on_finish(EmptyMove(), EmptyMove())
+
+    def submit(self, analyzer, **limits):
+        job = (analyzer, limits)
+
+        with self._lock:
+            if self._current is not None:
+                self._current.stop()
+
+            self._latest = job
+            self._jobs.put(job)
+
+    def cancel(self):
+        with self._lock:
+            self._latest = None
+
+            if self._current is not None:
+                self._current.stop()
+
+    def ponderhit(self, move_time):
+        with self._lock:
+            if self._current is not None:
+                self._current.set_move_time(move_time)
+
+            elif self._latest is not None:
+                self._latest[1]['move_time'] = move_time
+
+    def join(self):
+        self._jobs.join()
+
+    def shutdown(self):
+        self.cancel()
+
+        self._jobs.put(None)
+        self._thread.join()
+        self._stopped = True
+
+    @property
+    def state(self):
+        if self._stopped:
+            return 'stopped'
+        elif self._jobs.unfinished_tasks:
+            return 'searching'
+        else:
+            return 'idle'
+
+    def __str__(self):
+        return f'{type(self).__name__} {self.state}'
+
+    def __repr__(self):
+        return f'{type(self).__name__}()'
+
+
+def _serve(connection):
+    sys.setswitchinterval(SWITCH_INTERVAL)
+    worker = SearchWorker()
+    tables = None
+
+    while True:
+        try:
+            message = connection.recv()
+        except EOFError:
+            worker.shutdown()
+            break
+
+        if message[0] == 'submit':
+            _, job_id, position, limits = message
+
+            def on_finish(best_move, ponder_move, job_id=job_id):
+                connection.send(('finished', job_id, best_move, ponder_move))
+
+            def on_info(line, job_id=job_id):
+                connection.send(('info', job_id, line))
+
+            def on_report(report, job_id=job_id):
+                connection.send(('report', job_id, report))
+
+            if limits.pop('report', False):
+                limits['on_report'] = on_report
+
+            analyzer = Analyzer(position, tables=tables)
+            tables = analyzer.tables
+
+            worker.submit(analyzer, on_finish=on_finish, on_info=on_info, **limits)
+
+        elif message[0] == 'cancel':
+            worker.cancel()
+
+        elif message[0] == 'ponderhit':
+            worker.ponderhit(message[1])
+
+        elif message[0] == 'shutdown':
+            worker.shutdown()
+            connection.close()
+            break
+
+
+class ProcessSearchWorker:
+    '''
+
+    >>> from engine.analyzer import Position
+
+    >>> worker = ProcessSearchWorker()
+    >>> worker
+    ProcessSearchWorker()
+    >>> str(worker)
+    'ProcessSearchWorker idle'
+
+    >>> position = Position.from_fen(('6k1/5ppp/8/8/8/8/8/R5K1', 'w', '-', '-', '0', '1'))
+    >>> analyzer = Analyzer(position)
+
+    >>> worker.submit(analyzer, on_finish=lambda move, ponder_move: print(f'first {move}'))
+    >>> worker.state
+    'searching'
+    >>> worker.submit(analyzer, mate=1, on_finish=lambda move, ponder_move: print(f'second {move}'))
+    >>> worker.join() # doctest: +ELLIPSIS
+    first ...
+    second a1a8
+    >>> worker.state
+    'idle'
+
+    >>> def on_info(line):
+    ...     if line.startswith('info string nodes'):
+    ...         print(line)
+    >>> worker.submit(analyzer, plies=1, statistics=True, on_info=on_info)
+    >>> worker.join()
+    info string nodes 17
+
+    >>> worker.submit(analyzer, plies=1, on_report=lambda report: print(report['nodes']))
+    >>> worker.join()
+    17
+
+    >>> import signal
+    >>> worker.submit(analyzer, on_finish=lambda move, ponder_move: print(f'lost {move}'))
+    >>> os.kill(worker.pid, signal.SIGKILL); worker.join()
+    lost 0000
+    >>> worker.state
+    'idle'
+    >>> worker.submit(analyzer, mate=1, on_finish=lambda move, ponder_move: print(f'restarted {move}'))
+    >>> worker.join()
+    restarted a1a8
+
+    >>> worker.shutdown()
+    >>> worker.state
+    'stopped'
+
+    '''
+    def __init__(self):
+        self._context = get_context('spawn')
+
+        self._condition = Condition()
+        self._callbacks = {}
+        self._last_job_id = 0
+        self._stopping = False
+        self._stopped = False
+
+        self._start()
+
+    def _start(self):
+        self._connection, child_connection = self._context.Pipe()
+        self._process = self._context.Process(
+            target=_serve,
+            args=(child_connection,),
+
+            daemon=True
+        )
+        self._process.start()
+
+        self._reader = Thread(target=self._read, args=(self._connection,), daemon=True)
+        self._reader.start()
+
+    def _restart(self):
+        with self._condition:
+            lost_jobs = dict(self._callbacks)
+
+            self._process.join()
+            if not self._stopping:
+                self._start()
+
+        for on_finish, _, _ in lost_jobs.values():
+            if on_finish is not None:
+                on_finish(EmptyMove(), EmptyMove())
+
+        with self._condition:
+            for job_id in lost_jobs:
+                del self._callbacks[job_id]
+            self._condition.notify_all()
+
+    def _send(self, message):
+        try:
+            self._connection.send(message)
+        except OSError:
+            pass # the reader fails the pending jobs once it sees the process is gone
+
+    def _read(self, connection):
+        while True:
+            try:
+                message = connection.recv()
+            except (EOFError, OSError):
+                self._restart()
+                break
+
+            on_finish, on_info, on_report = self._callbacks.get(message[1], (None, None, None))
+
+            if message[0] == 'info':
+                if on_info is not None:
+                    on_info(message[2])
+                continue
+
+            if message[0] == 'report':
+                if on_report is not None:
+                    on_report(message[2])
+                continue
+
+            if on_finish is not None:
+                on_finish(*message[2: ])
+
+            with self._condition:
+                del self._callbacks[message[1]]
+                self._condition.notify_all()
+
+    def submit(self, analyzer, on_finish=None, on_info=None, on_report=None, **limits):
+        with self._condition:
+            self._last_job_id += 1
+            self._callbacks[self._last_job_id] = (on_finish, on_info, on_report)
+
+            self._send(
+                ('submit', self._last_job_id, analyzer.position, dict(limits, report=on_report is not None))
+            )
+
+    def cancel(self):
+        self._send(('cancel', ))
+
+    def ponderhit(self, move_time):
+        self._send(('ponderhit', move_time))
+
+    def join(self):
+        with self._condition:
+            self._condition.wait_for(lambda: not self._callbacks)
+
+    def shutdown(self):
+        with self._condition:
+            self._stopping = True
+
+        self.cancel()
+
+        self._send(('shutdown', ))
+        self._process.join()
+        self._reader.join()
+        self._stopped = True
+
+    @property
+    def pid(self):
+        return self._process.pid
+
+    @property
+    def state(self):
+        if self._stopped:
+            return 'stopped'
+        elif self._callbacks:
+            return 'searching'
+        else:
+            return 'idle'
+
+    def __str__(self):
+        return f'{type(self).__name__} {self.state}'
+
+    def __repr__(self):
+        return f'{type(self).__name__}()'
+
+
+class SearchPool:
+    '''
+
+    >>> from engine.analyzer import Position
+
+    >>> pool = SearchPool(2)
+    >>> pool
+    SearchPool(2)
+    >>> str(pool)
+    'SearchPool of 2 processes, 2 idle'
+
+    >>> session = SessionWorker(pool)
+    >>> session.submit(Analyzer(Position.starting_position()), on_finish=lambda *moves: print('finished'))
+    >>> str(pool)
+    'SearchPool of 2 processes, 1 idle'
+    >>> pool.shutdown()
+    finished
+    >>> [worker.state for worker in pool.workers]
+    ['stopped', 'stopped']
+
+    '''
+    def __init__(self, size=None):
+        if size is None:
+            size = os.cpu_count()
+
+        self._size = size
+        self._lock = Lock()
+
+        self._workers = [ProcessSearchWorker() for _ in range(size)]
+        self._idle = list(self._workers)
+        self._sessions = deque()
+        self._stopped = False
+
+    def schedule(self, session):
+        if session not in self._sessions:
+            self._sessions.append(session)
+
+        self._dispatch()
+
+    def _dispatch(self):
+        while self._idle and self._sessions and not self._stopped:
+            session = self._sessions.popleft()
+
+            if session.running is not None or not session.jobs:
+                continue
+
+            worker = self._idle.pop()
+            analyzer, limits = session.jobs.popleft()
+            on_finish = limits.pop('on_finish', None)
+
+            session.start(worker)
+            worker.submit(
+                analyzer,
+                on_finish=partial(self._finish, worker, session, on_finish),
+                on_info=limits.pop('on_info', None),
+                on_report=limits.pop('on_report', None),
+                **limits
+            )
+
+    def _finish(self, worker, session, on_finish, best_move, ponder_move):
+        if on_finish is not None:
+            on_finish(best_move, ponder_move)
+
+        with self._lock:
+            self._idle.append(worker)
+            session.finish()
+
+            if session.jobs:
+                self._sessions.append(session)
+            self._dispatch()
+
+    def shutdown(self):
+        with self._lock:
+            self._stopped = True
+
+        for worker in self._workers:
+            worker.shutdown()
+
+    @property
+    def lock(self):
+        return self._lock
+
+    @property
+    def workers(self):
+        return self._workers
+
+    def __str__(self):
+        return f'{type(self).__name__} of {self._size} processes, {len(self._idle)} idle'
+
+    def __repr__(self):
+        return f'{type(self).__name__}({self._size})'
+
+
+class SessionWorker:
+    '''
+
+    >>> from engine.analyzer import Position
+
+    >>> pool = SearchPool(1)
+    >>> session_a, session_b = SessionWorker(pool), SessionWorker(pool)
+    >>> session_a
+    SessionWorker()
+    >>> str(session_a)
+    'SessionWorker idle'
+
+    >>> position = Position.from_fen(('6k1/5ppp/8/8/8/8/8/R5K1', 'w', '-', '-', '0', '1'))
+    >>> analyzer = Analyzer(position)
+
+    >>> session_a.submit(analyzer, on_finish=lambda move, ponder_move: print(f'a {move}'))
+    >>> session_b.submit(analyzer, mate=1, on_finish=lambda move, ponder_move: print(f'b {move}'))
+    >>> session_a.state, session_b.state
+    ('searching', 'queued')
+    >>> session_a.cancel(); session_b.join() # doctest: +ELLIPSIS
+    a ...
+    b a1a8
+    >>> session_a.state, session_b.state
+    ('idle', 'idle')
+
+    >>> session_a.submit(analyzer, on_finish=lambda move, ponder_move: print(f'a {move}'))
+    >>> session_b.submit(analyzer, on_finish=lambda move, ponder_move: print(f'b {move}'))
+    >>> session_a.pending, session_b.pending
+    (1, 1)
+    >>> session_b.cancel(); session_b.join() # doctest: +ELLIPSIS
+    b ...
+    >>> session_a.state, session_b.state
+    ('searching', 'idle')
+    >>> session_a.cancel(); session_a.join() # doctest: +ELLIPSIS
+    a ...
+
+    >>> pool.shutdown()
+
+    '''
+    def __init__(self, pool, loop=None):
+        self._pool = pool
+        self._loop = loop
+
+        self._jobs = deque()
+        self._superseded = deque()
+        self._running = None
+        self._changed = Condition(pool.lock)
+
+        self._capacity = asyncio.Event() if loop is not None else None
+
+    def _supersede_jobs(self):
+        self._superseded.extend(self._jobs)
+        self._jobs.clear()
+
+        if self._running is not None:
+            self._running.cancel()
+        else:
+            self._resolve_superseded()
+
+    def _resolve_superseded(self):
+        while self._superseded:
+            analyzer, limits = self._superseded.popleft()
+            analyzer.search(**dict(limits, plies=0, profile=None))
+
+    def _notify(self):
+        self._changed.notify_all()
+
+        if self._capacity is not None:
+            self._loop.call_soon_threadsafe(self._capacity.set)
+
+    def start(self, worker):
+        self._running = worker
+        self._notify()
+
+    def finish(self):
+        self._running = None
+        self._resolve_superseded()
+        self._notify()
+
+    def submit(self, analyzer, **limits):
+        with self._pool.lock:
+            self._supersede_jobs()
+
+            self._jobs.append((Analyzer(analyzer.position, tables=analyzer.tables), limits))
+            self._pool.schedule(self)
+
+    def cancel(self):
+        with self._pool.lock:
+            self._supersede_jobs()
+
+    def ponderhit(self, move_time):
+        with self._pool.lock:
+            if self._running is not None:
+                self._running.ponderhit(move_time)
+
+            elif self._jobs:
+                self._jobs[-1][1]['move_time'] = move_time
+
+    def join(self):
+        with self._pool.lock:
+            self._changed.wait_for(
+                lambda: self._running is None and not self._jobs and not self._superseded
+            )
+
+    async def wait_for_capacity(self):
+        while self.pending >= MAX_PENDING_JOBS:
+            self._capacity.clear()
+            await self._capacity.wait()
+
+    def shutdown(self):
+        self.cancel()
+
+    @property
+    def jobs(self):
+        return self._jobs
+
+    @property
+    def running(self):
+        return self._running
+
+    @property
+    def pending(self):
+        '''
+
+        Searches not yet answered: the running one, the queued one and
+        the superseded ones still waiting for the running one to stop.
+
+        '''
+        return len(self._jobs) + len(self._superseded) + (self._running is not None)
+
+    @property
+    def state(self):
+        if self._running is not None:
+            return 'searching'
+        elif self._jobs:
+            return 'queued'
+        else:
+            return 'idle'
+
+    def __str__(self):
+        return f'{type(self).__name__} {self.state}'
+
+    def __repr__(self):
+        return f'{type(self).__name__}()'
+
+
+if __name__ == '__main__':
+    doctest.testmod()
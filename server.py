@@ -0,0 +1,153 @@
+import argparse
+import asyncio
+
+from engine import analyzer as engine
+from engine.telemetry import TelemetrySink
+from engine.worker import SearchPool, SessionWorker
+from uci import UCI
+
+DEFAULT_HOST = '127.0.0.1'
+DEFAULT_PORT = 7070
+
+LOOP_COMMANDS = ['uci', 'debug', 'isready', 'setoption'] # answered without waiting for a thread
+REFUSED_COMMANDS = ['bench'] # would hold the server process for seconds and stall every session
+
+
+class Server:
+    '''
+
+    >>> import os, tempfile
+
+    >>> async def session(path, commands):
+    ...     reader, writer = await asyncio.open_unix_connection(path)
+    ...     print((await reader.readline()).decode().strip())
+    ...     for command in commands:
+    ...         writer.write(f'{command}\\n'.encode())
+    ...     lines = []
+    ...     while not lines or not lines[-1].startswith('bestmove'):
+    ...         line = (await reader.readline()).decode().strip()
+    ...         if not line.startswith('info'):
+    ...             lines.append(line)
+    ...     writer.write(b'quit\\n')
+    ...     writer.close()
+    ...     return lines
+
+    >>> async def main(path):
+    ...     server = Server(processes=1)
+    ...     serving = asyncio.ensure_future(server.serve(path=path))
+    ...     while not os.path.exists(path):
+    ...         await asyncio.sleep(0.01)
+    ...     results = await asyncio.gather(
+    ...         session(path, ['isready', 'position fen 6k1/5ppp/8/8/8/8/8/R5K1 w - - 0 1', 'go mate 1']),
+    ...         session(path, ['bench', 'position fen 6k1/5ppp/8/8/8/8/8/R5K1 w - - 0 1', 'go depth 1 searchmoves g1h1'])
+    ...     )
+    ...     serving.cancel()
+    ...     server.shutdown()
+    ...     return results
+
+    >>> with tempfile.TemporaryDirectory() as directory:
+    ...     asyncio.run(main(os.path.join(directory, 'engine.sock')))
+    LeskoChessEngine 0.1 by Lesko Vladislav
+    LeskoChessEngine 0.1 by Lesko Vladislav
+    [['readyok', 'bestmove a1a8'], ['bestmove g1h1']]
+
+    '''
+    def __init__(self, processes=None, name=engine.NAME, author=engine.AUTHOR, telemetry=None):
+        self._name, self._author = name, author
+        self._pool = SearchPool(processes)
+        self._telemetry = telemetry
+
+    async def _serve_client(self, reader, writer):
+        loop = asyncio.get_running_loop()
+
+        def output(line):
+            def write():
+                if not writer.is_closing():
+                    writer.write(f'{line}\n'.encode())
+
+            loop.call_soon_threadsafe(write)
+
+        worker = SessionWorker(self._pool, loop)
+        uci = UCI(self._name, self._author, worker=worker, output=output, telemetry=self._telemetry)
+        uci.greet()
+
+        while True:
+            line = await reader.readline()
+            if not line:
+                break
+
+            command = line.decode().split()
+            if not command:
+                continue
+
+            if command[0] in REFUSED_COMMANDS:
+                output(f'info string {command[0]} is not available in server mode')
+                continue
+
+            if command[0] == 'go':
+                await worker.wait_for_capacity()
+
+            try:
+                if command[0] in LOOP_COMMANDS:
+                    uci.handle(' '.join(command))
+                else:
+                    await loop.run_in_executor(None, uci.handle, ' '.join(command))
+
+            except SystemExit:
+                break
+
+            except Exception:
+                continue
+
+            await writer.drain()
+
+        worker.shutdown()
+        writer.close()
+
+    async def serve(self, host=DEFAULT_HOST, port=DEFAULT_PORT, path=None):
+        if path is not None:
+            server = await asyncio.start_unix_server(self._serve_client, path)
+        else:
+            server = await asyncio.start_server(self._serve_client, host, port)
+
+        async with server:
+            await server.serve_forever()
+
+    def shutdown(self):
+        self._pool.shutdown()
+
+    def __str__(self):
+        return f'{type(self).__name__} with {self._pool}'
+
+    def __repr__(self):
+        return f'{type(self).__name__}()'
+
+
+def main():
+    parser = argparse.ArgumentParser(description=f'{engine.NAME} UCI server')
+    parser.add_argument('--host', default=DEFAULT_HOST)
+    parser.add_argument('--port', type=int, default=DEFAULT_PORT)
+    parser.add_argument('--unix', metavar='PATH', help='listen on a Unix socket instead of TCP')
+    parser.add_argument('--processes', type=int, help='search processes, one per CPU by default')
+    parser.add_argument('--telemetry', metavar='PATH', help='append one JSON record per search to PATH')
+    parser.add_argument('--metrics', metavar='PATH', help='keep Prometheus metrics of all searches in PATH')
+    arguments = parser.parse_args()
+
+    telemetry = None
+    if arguments.telemetry is not None:
+        telemetry = TelemetrySink(arguments.telemetry, arguments.metrics)
+
+    server = Server(arguments.processes, telemetry=telemetry)
+
+    try:
+        asyncio.run(server.serve(arguments.host, arguments.port, arguments.unix))
+
+    except KeyboardInterrupt:
+        pass
+
+    finally:
+        server.shutdown()
+
+
+if __name__ == '__main__':
+    main()
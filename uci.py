@@ -1,11 +1,35 @@
-import doctest
+import os
 import sys
-from threading import Thread
-from time import sleep, time
+from functools import partial
+from threading import Lock
 
 from engine import analyzer as engine
-
-INFINITY = 1e18
+from engine.bench import bench
+from engine.telemetry import TelemetrySink
+from engine.worker import ProcessSearchWorker, SearchWorker
+
+GO_FLAGS = ['ponder', 'infinite']
+GO_KEYWORDS = GO_FLAGS + [
+    'searchmoves', 'wtime', 'btime', 'winc', 'binc',
+    'movestogo', 'depth', 'nodes', 'mate', 'movetime'
+]
+
+MOVES_TO_GO = 30 # assumed remaining moves when the GUI does not send movestogo
+MAX_CLOCK_FRACTION = 0.5 # most of the remaining clock a single move may use
+MOVE_OVERHEAD = 50 # milliseconds kept back for stopping the search and sending bestmove
+
+OPTIONS = {
+    'Ponder': {'type': 'check', 'default': True},
+    'Profile': {'type': 'string', 'default': os.environ.get('ENGINE_PROFILE', '')},
+    'ProfileHz': {
+        'type': 'spin', 'default': int(os.environ.get('ENGINE_PROFILE_HZ', engine.PROFILE_HZ)),
+        'min': 1, 'max': 10000
+    },
+    'Telemetry': {'type': 'string', 'default': os.environ.get('ENGINE_TELEMETRY', '')},
+    'TelemetryMetrics': {'type': 'string', 'default': os.environ.get('ENGINE_METRICS', '')},
+    'FutilityMargin': {'type': 'spin', 'default': engine.FUTILITY_MARGIN, 'min': 0, 'max': 1000},
+    'EvalCache': {'type': 'spin', 'default': engine.EVAL_CACHE_SIZE, 'min': 0, 'max': 1024},
+}
 
 
 class UCI:
@@ -16,27 +40,67 @@ class UCI:
     >>> uci.handle('uci')
     id name Engine
     id author author
+    option name Ponder type check default true
+    option name Profile type string default <empty>
+    option name ProfileHz type spin default 1000 min 1 max 10000
+    option name Telemetry type string default <empty>
+    option name TelemetryMetrics type string default <empty>
+    option name FutilityMargin type spin default 218 min 0 max 1000
+    option name EvalCache type spin default 16 min 0 max 1024
     uciok
     >>> uci.handle('isready')
     readyok
     >>> uci.handle('position startpos moves e2e4')
     >>> uci.handle('go movetime 1000')
-    >>> uci.handle('stop'); sleep(0.005) # doctest: +ELLIPSIS
+    >>> uci.handle('stop'); uci.wait() # doctest: +ELLIPSIS
     bestmove ...
     >>> uci.handle('isready')
     readyok
 
+    >>> uci = UCI(process=True)
+
+    >>> uci.handle('position startpos moves e2e4')
+    >>> uci.handle('go')
+    >>> uci.handle('isready')
+    readyok
+    >>> uci.handle('stop'); uci.wait() # doctest: +ELLIPSIS
+    bestmove ...
+    >>> uci.handle('quit')
+    Traceback (most recent call last):
+    SystemExit
+
     '''
-    def __init__(self, name='Engine', author='author'):
+    def __init__(self, name='Engine', author='author', process=False, worker=None, output=print,
+                 telemetry=None):
         self._name, self._author = name, author
+        self._output = output
 
         self._position = engine.Position.starting_position()
         self._analyzer = engine.Analyzer(self._position)
 
+        if worker is not None:
+            self._worker = worker
+        elif process:
+            self._worker = ProcessSearchWorker()
+        else:
+            self._worker = SearchWorker()
+
+        self._options = {
+            name: option['default'] for name, option in OPTIONS.items()
+        }
+
+        self._shared_telemetry = telemetry
+        self._telemetry = None
+
+        self._lock = Lock()
+        self._holding = False
+        self._held_best_move = None
+        self._ponder_move_time = None
+
         self._debug = False
 
     def greet(self):
-        print(f'{self._name} by {self._author}')
+        self._output(f'{self._name} by {self._author}')
 
     def _identify(self):
         '''
@@ -46,13 +110,84 @@ class UCI:
         >>> uci.handle('uci')
         id name Engine
         id author author
+        option name Ponder type check default true
+        option name Profile type string default <empty>
+        option name ProfileHz type spin default 1000 min 1 max 10000
+        option name Telemetry type string default <empty>
+        option name TelemetryMetrics type string default <empty>
+        option name FutilityMargin type spin default 218 min 0 max 1000
+        option name EvalCache type spin default 16 min 0 max 1024
         uciok
 
         '''
-        print(f'id name {self._name}')
-        print(f'id author {self._author}')
+        self._output(f'id name {self._name}')
+        self._output(f'id author {self._author}')
+
+        for name, option in OPTIONS.items():
+            self._output(self._describe_option(name, option))
+
+        self._output('uciok')
+
+    def _describe_option(self, name, option):
+        default = option['default']
+
+        if option['type'] == 'check':
+            default = 'true' if default else 'false'
+        elif default == '':
+            default = '<empty>'
+
+        description = f'option name {name} type {option["type"]} default {default}'
+        if option['type'] == 'spin':
+            description += f' min {option["min"]} max {option["max"]}'
+
+        return description
+
+    def _handle_setoption(self, arguments):
+        '''
+
+        >>> uci = UCI()
+
+        >>> uci.handle('setoption name Profile value /tmp/engine search.stacks')
+        >>> uci.options['Profile']
+        '/tmp/engine search.stacks'
+        >>> uci.handle('setoption name Profile value <empty>')
+        >>> uci.options['Profile']
+        ''
+        >>> uci.handle('setoption name ProfileHz value 100000')
+        >>> uci.options['ProfileHz']
+        10000
+        >>> uci.handle('setoption name Ponder value false')
+        >>> uci.options['Ponder']
+        False
+        >>> uci.handle('setoption name Unknown value 1')
+        >>> 'Unknown' in uci.options
+        False
+
+        '''
+        if 'name' not in arguments:
+            return
+
+        name_index = arguments.index('name') + 1
+        if 'value' in arguments:
+            value_index = arguments.index('value')
+            name = ' '.join(arguments[name_index: value_index])
+            value = ' '.join(arguments[value_index + 1: ])
+        else:
+            name = ' '.join(arguments[name_index: ])
+            value = ''
+
+        if name not in OPTIONS:
+            return
+
+        option = OPTIONS[name]
+        if option['type'] == 'check':
+            value = (value == 'true')
+        elif option['type'] == 'spin':
+            value = min(max(int(value), option['min']), option['max'])
+        elif value == '<empty>':
+            value = ''
 
-        print('uciok')
+        self._options[name] = value
 
     def _handle_debug(self, arguments):
         '''
@@ -83,8 +218,16 @@ class UCI:
         >>> uci.handle('isready')
         readyok
 
+        >>> uci.handle('debug on')
+        >>> uci.handle('isready')
+        info string worker idle
+        readyok
+
         '''
-        print('readyok')
+        if self._debug:
+            self._output(f'info string worker {self._worker.state}')
+
+        self._output('readyok')
 
     def _handle_position(self, arguments):
         '''
@@ -122,8 +265,49 @@ class UCI:
         else:
             starting_position = starting_position[1: ]
 
+        self._worker.cancel()
+        self._worker.join()
+
         self._position = engine.Position.from_fen(starting_position, moves)
-        self._analyzer = engine.Analyzer(self._position)
+        self._analyzer.position = self._position
+
+    def _parse_go(self, arguments):
+        '''
+
+        >>> uci = UCI()
+
+        >>> uci._parse_go(['depth', '3', 'nodes', '1000', 'mate', '2'])
+        {'depth': 3, 'nodes': 1000, 'mate': 2}
+        >>> uci._parse_go(['movetime', '100', 'searchmoves', 'e2e4', 'd2d4', 'infinite'])
+        ... # doctest: +NORMALIZE_WHITESPACE
+        {'movetime': 100, 'searchmoves': [Move(Coordinate(4, 1), Coordinate(4, 3), False),
+                                          Move(Coordinate(3, 1), Coordinate(3, 3), False)],
+         'infinite': True}
+        >>> uci._parse_go([])
+        {}
+
+        '''
+        limits = {}
+
+        index = 0
+        while index < len(arguments):
+            keyword = arguments[index]
+            index += 1
+
+            if keyword == 'searchmoves':
+                limits[keyword] = []
+                while index < len(arguments) and arguments[index] not in GO_KEYWORDS:
+                    limits[keyword].append(engine.Move(arguments[index]))
+                    index += 1
+
+            elif keyword in GO_FLAGS:
+                limits[keyword] = True
+
+            elif keyword in GO_KEYWORDS and index < len(arguments):
+                limits[keyword] = int(arguments[index])
+                index += 1
+
+        return limits
 
     def _handle_go(self, arguments):
         '''
@@ -131,44 +315,231 @@ class UCI:
         >>> uci = UCI()
 
         >>> uci.handle('go')
-        >>> uci.handle('stop'); sleep(0.005) # doctest: +ELLIPSIS
+        >>> uci.handle('stop'); uci.wait() # doctest: +ELLIPSIS
         bestmove ...
 
-        >>> uci.handle('go movetime 0'); sleep(0.005) # doctest: +ELLIPSIS
+        >>> uci.handle('go movetime 0'); uci.wait() # doctest: +ELLIPSIS
         bestmove ...
 
+        >>> uci.handle('position fen 6k1/5ppp/8/8/8/8/8/R5K1 w - - 0 1')
+        >>> uci.handle('go mate 1'); uci.wait()
+        bestmove a1a8
+
+        >>> uci.handle('go depth 1 searchmoves g1f1'); uci.wait() # doctest: +ELLIPSIS
+        info depth 1 score cp 178 nodes 1 nps ... time ... pv g1f1
+        bestmove g1f1
+
+        >>> uci.handle('debug on')
+        >>> uci.handle('go depth 1 searchmoves g1f1'); uci.wait() # doctest: +ELLIPSIS
+        info depth 1 score cp 178 nodes 1 nps ... time ... pv g1f1
+        info string legality_rejections 0
+        info string eval_cache_probes 1
+        info string eval_cache_hits 1
+        info string nodes 1
+        ...
+        info string time _estimate ... s in 1 calls
+        bestmove g1f1
+
+        '''
+        limits = self._parse_go(arguments)
+        move_time = self._move_time(limits)
+        telemetry = self._telemetry_sink()
+
+        with self._lock:
+            self._holding = 'ponder' in limits or 'infinite' in limits
+            self._held_best_move = None
+
+            if 'ponder' in limits:
+                self._ponder_move_time = move_time
+                move_time = None
+
+        self._worker.submit(
+            self._analyzer,
+            plies=limits.get('depth'),
+            nodes=limits.get('nodes'),
+            mate=limits.get('mate'),
+            search_moves=limits.get('searchmoves'),
+            move_time=move_time,
+            on_finish=self._report_best_move,
+            statistics=self._debug,
+            on_info=self._output,
+            profile=self._options['Profile'] or None,
+            profile_hz=self._options['ProfileHz'],
+            futility_margin=self._options['FutilityMargin'],
+            eval_cache=self._options['EvalCache'],
+            on_report=None if telemetry is None else partial(self._record_report, telemetry)
+        )
+
+    def _telemetry_sink(self):
         '''
-        def monitoring(analyzer, start_time, duration=INFINITY):
-            while(
-                (not analyzer.ready) and
-                (time() < start_time + duration)
-            ):
-                sleep(0.001)
 
-            analyzer.stop()
-            best_move = analyzer.best_move
+        >>> import json, tempfile
 
-            print(f'bestmove {best_move}')
-            sys.stdout.flush()
+        >>> uci = UCI()
+        >>> uci._telemetry_sink() is None
+        True
+
+        >>> directory = tempfile.TemporaryDirectory()
+        >>> path = os.path.join(directory.name, 'searches.jsonl')
+        >>> uci.handle(f'setoption name Telemetry value {path}')
+        >>> uci.handle(f'setoption name TelemetryMetrics value {directory.name}/engine.prom')
+        >>> uci._telemetry_sink() # doctest: +ELLIPSIS
+        TelemetrySink('.../searches.jsonl', '.../engine.prom')
+
+        >>> uci.handle('position fen 6k1/5ppp/8/8/8/8/8/R5K1 w - - 0 1')
+        >>> uci.handle('go depth 1 searchmoves g1f1'); uci.wait() # doctest: +ELLIPSIS
+        info depth 1 score cp 178 nodes 1 nps ... time ... pv g1f1
+        bestmove g1f1
+        >>> with open(path) as records_file:
+        ...     record = json.loads(records_file.readline())
+        >>> record['fen'], record['nodes'], record['best_move']
+        ('6k1/5ppp/8/8/8/8/8/R5K1 w - - 0 1', 1, 'g1f1')
+        >>> with open(f'{directory.name}/engine.prom') as metrics_file:
+        ...     'engine_searches_total 1' in metrics_file.read()
+        True
 
-        start_time = time()
-        self._analyzer.go()
+        >>> directory.cleanup()
 
-        if 'movetime' in arguments:
-            move_time_index = arguments.index('movetime') + 1
-            move_time = int(arguments[move_time_index]) / 1000.0
+        '''
+        if self._shared_telemetry is not None:
+            return self._shared_telemetry
+
+        path = self._options['Telemetry']
+        if not path:
+            return None
+
+        metrics_path = self._options['TelemetryMetrics'] or None
+
+        telemetry = self._telemetry
+        if telemetry is None or (telemetry.path, telemetry.metrics_path) != (path, metrics_path):
+            self._telemetry = TelemetrySink(path, metrics_path)
+
+        return self._telemetry
+
+    def _record_report(self, telemetry, report):
+        try:
+            telemetry.record(report)
+        except OSError as error:
+            self._output(f'info string telemetry not written: {error}')
+
+    def _move_time(self, limits):
+        '''
+
+        >>> uci = UCI()
+
+        >>> uci._move_time({'movetime': 500})
+        0.5
+        >>> uci._move_time({'wtime': 60000, 'btime': 1000, 'winc': 1000})
+        3.0
+        >>> uci._move_time({'wtime': 60000, 'btime': 1000, 'movestogo': 10})
+        6.0
+
+        A move never takes more than a fraction of the clock, less the
+        overhead of answering.
+
+        >>> uci._move_time({'wtime': 500, 'btime': 500, 'winc': 2000})
+        0.2
+        >>> uci._move_time({'wtime': 60, 'btime': 60})
+        0.0
+        >>> uci._move_time({'depth': 3}) is None
+        True
+
+        '''
+        if 'movetime' in limits:
+            return limits['movetime'] / 1000.0
+
+        time_left, increment = ('wtime', 'winc') if self._position.turn == 'w' else ('btime', 'binc')
+
+        if time_left in limits:
+            moves_to_go = limits.get('movestogo', MOVES_TO_GO)
+            move_time = limits[time_left] / moves_to_go + limits.get(increment, 0)
+            max_move_time = max(limits[time_left] * MAX_CLOCK_FRACTION - MOVE_OVERHEAD, 0)
+
+            return min(move_time, max_move_time) / 1000.0
+
+        return None
+
+    def _report_best_move(self, best_move, ponder_move):
+        with self._lock:
+            if self._holding:
+                self._held_best_move = (best_move, ponder_move)
+                return
+
+        self._print_best_move(best_move, ponder_move)
+
+    def _print_best_move(self, best_move, ponder_move):
+        if isinstance(ponder_move, engine.EmptyMove):
+            self._output(f'bestmove {best_move}')
         else:
-            move_time = INFINITY
+            self._output(f'bestmove {best_move} ponder {ponder_move}')
 
-        monitoring_thread = Thread(
-            target=monitoring,
-            args=(self._analyzer, start_time, move_time),
-            daemon=True
-        )
-        monitoring_thread.start()
+        sys.stdout.flush()
+
+    def _release_best_move(self):
+        with self._lock:
+            self._holding = False
+            held_best_move, self._held_best_move = self._held_best_move, None
+
+        if held_best_move is not None:
+            self._print_best_move(*held_best_move)
+
+        return held_best_move is not None
+
+    def _handle_ponderhit(self):
+        '''
+
+        >>> uci = UCI()
+
+        >>> uci.handle('position fen 7k/7p/8/8/8/8/8/R3K3 w - - 0 1')
+        >>> uci.handle('go ponder depth 2 searchmoves a1a8'); uci.wait() # doctest: +ELLIPSIS
+        info depth 1 score cp 423 nodes 1 nps ... time ... pv a1a8
+        info depth 2 score cp 418 nodes 2 nps ... time ... pv a1a8 h8g7
+        >>> uci.handle('ponderhit')
+        bestmove a1a8 ponder h8g7
+
+        >>> uci.handle('position startpos moves e2e4 e7e5')
+        >>> uci.handle('go ponder movetime 100')
+        >>> uci.handle('ponderhit'); uci.wait() # doctest: +ELLIPSIS
+        bestmove ...
+
+        '''
+        if not self._release_best_move() and self._ponder_move_time is not None:
+            self._worker.ponderhit(self._ponder_move_time)
 
     def _handle_stop(self):
-        self._analyzer.stop()
+        '''
+
+        >>> uci = UCI()
+
+        >>> uci.handle('go infinite depth 1'); uci.wait() # doctest: +ELLIPSIS
+        info depth 1 score cp 10 nodes 20 nps ... time ... pv ...
+        >>> uci.handle('stop') # doctest: +ELLIPSIS
+        bestmove ...
+
+        >>> uci.handle('go ponder')
+        >>> uci.handle('stop'); uci.wait() # doctest: +ELLIPSIS
+        bestmove ...
+
+        '''
+        if not self._release_best_move():
+            self._worker.cancel()
+
+    def _handle_bench(self, arguments):
+        '''
+
+        >>> uci = UCI()
+
+        >>> uci.handle('bench 0') # doctest: +ELLIPSIS
+        Position 1/5: ...
+        ...
+        Nodes searched  : 0
+        Nodes/second    : ...
+
+        '''
+        if arguments:
+            bench(int(arguments[0]), output=self._output)
+        else:
+            bench(output=self._output)
 
     def handle(self, command):
         command = command.split()
@@ -182,6 +553,9 @@ class UCI:
         elif command[0] == 'isready':
             self._handle_ready()
 
+        elif command[0] == 'setoption':
+            self._handle_setoption(command[1: ])
+
         elif command[0] == 'position':
             self._handle_position(command[1: ])
 
@@ -191,9 +565,19 @@ class UCI:
         elif command[0] == 'stop':
             self._handle_stop()
 
+        elif command[0] == 'ponderhit':
+            self._handle_ponderhit()
+
+        elif command[0] == 'bench':
+            self._handle_bench(command[1: ])
+
         elif command[0] == 'quit':
+            self._worker.shutdown()
             raise SystemExit
 
+    def wait(self):
+        self._worker.join()
+
     @property
     def name(self):
         return self._name
@@ -206,13 +590,21 @@ class UCI:
     def debug(self):
         return self._debug
 
+    @property
+    def options(self):
+        return self._options
+
     @property
     def position(self):
         return ' '.join(self._position.as_fen)
 
 
 def main():
-    uci = UCI(engine.NAME, engine.AUTHOR)
+    if sys.argv[1: 2] == ['bench']:
+        bench(*[int(argument) for argument in sys.argv[2: 3]])
+        return
+
+    uci = UCI(engine.NAME, engine.AUTHOR, process='--process' in sys.argv[1: ])
     uci.greet()
 
     while True:
@@ -228,5 +620,4 @@ def main():
 
 
 if __name__ == '__main__':
-    doctest.testmod()
     main()